@@ -0,0 +1,155 @@
+import numpy as np
+from MancalaGame import sowing_tables
+
+class BatchMancala:
+    def __init__(self, n_games, pits_per_player=6, stones_per_pit=4):
+        """
+        Lock-step Mancala engine for n_games games at once, following the same rules as Mancala.play.
+
+        board: (n_games, (pits_per_player+1)*2) integer array, same layout as Mancala.board for every game
+        current_player: (n_games,) array of 1/2
+        done: (n_games,) bool, set by winning_eval once a game has ended (and its board was swept)
+        num_moves: (n_games,) moves played in each game
+        """
+        self.n_games = n_games
+        self.pits_per_player = pits_per_player
+        P = pits_per_player
+        self.board_size = (P + 1) * 2
+        self.p1_pits_index = [0, P - 1]
+        self.p1_mancala_index = P
+        self.p2_pits_index = [P + 1, self.board_size - 2]
+        self.p2_mancala_index = self.board_size - 1
+
+        self.board = np.full((n_games, self.board_size), stones_per_pit, dtype=np.int32)
+        self.board[:, self.p1_mancala_index] = 0
+        self.board[:, self.p2_mancala_index] = 0
+        self.current_player = np.ones(n_games, dtype=np.int8)
+        self.done = np.zeros(n_games, dtype=bool)
+        self.num_moves = np.zeros(n_games, dtype=np.int32)
+
+        # Per (player, pit, stones % lap_size) tables, built from the same SowingTables as Mancala.play
+        tables = sowing_tables(P)
+        lap_size = tables.lap_size
+        self.lap_size = lap_size
+        self.pit_start = np.array([self.p1_pits_index[0], self.p2_pits_index[0]], dtype=np.intp)
+        self.mancala = np.array([self.p1_mancala_index, self.p2_mancala_index], dtype=np.intp)
+        self.sow = np.zeros((2, P, lap_size, self.board_size), dtype=np.int32)   # Partial-lap increments as dense rows
+        for p in range(2):
+            for pit in range(P):
+                for r in range(lap_size):
+                    self.sow[p, pit, r, list(tables.sow[p][pit][r])] = 1
+        self.landing = np.array(tables.landing, dtype=np.intp)
+        self.can_capture = np.array(tables.can_capture, dtype=bool)
+        self.lap_mask = np.zeros((2, self.board_size), dtype=np.int32)          # 1 where a full lap drops a stone
+        for p in range(2):
+            self.lap_mask[p, list(tables.lap[p])] = 1
+
+    def valid_mask(self, games=None):
+        """
+        (n, pits_per_player) bool array of non-empty pits for the player to move, pit i+1 is column i
+        """
+        P = self.pits_per_player
+        board = self.board if games is None else self.board[games]
+        player = self.current_player if games is None else self.current_player[games]
+        return np.where((player == 1)[:, None], board[:, 0:P], board[:, P + 1:2 * P + 1]) > 0
+
+    def winning_eval(self, games=None):
+        """
+        Vectorized Mancala.winning_eval: games with one side empty get the remaining stones swept into the mancalas
+        and are marked done. Only the games in games (default all) are checked. Returns the done mask.
+        """
+        P = self.pits_per_player
+        games = np.flatnonzero(~self.done) if games is None else games
+        board = self.board[games]
+        p1_sum = board[:, 0:P].sum(axis=1)
+        p2_sum = board[:, P + 1:2 * P + 1].sum(axis=1)
+        ended = (p1_sum == 0) | (p2_sum == 0)
+        if ended.any():
+            rows = games[ended]
+            self.board[rows, self.p1_mancala_index] += p1_sum[ended]
+            self.board[rows, self.p2_mancala_index] += p2_sum[ended]
+            self.board[rows, 0:P] = 0
+            self.board[rows, P + 1:2 * P + 1] = 0
+            self.done[rows] = True
+        return self.done
+
+    def play(self, games, pits):
+        """
+        Plays pits[k] (1-indexed, must be valid) in game games[k] for every k, like Mancala.play
+        """
+        P = self.pits_per_player
+        player = self.current_player[games].astype(np.intp) - 1
+        board = self.board[games]
+        rows = np.arange(len(games))
+
+        # Pick up stones
+        source = self.pit_start[player] + pits - 1
+        stones = board[rows, source]
+        board[rows, source] = 0
+
+        # Sow: full laps go to every pit but the opponent's mancala, the remainder comes from the lookup table
+        full_laps, remainder = np.divmod(stones, self.lap_size)
+        board += self.sow[player, pits - 1, remainder]
+        if full_laps.any():
+            board += full_laps[:, None] * self.lap_mask[player]
+
+        # Last stone: capture if it landed in an empty pit on the own side
+        last = self.landing[player, pits - 1, remainder]
+        own_mancala = self.mancala[player]
+        capture = self.can_capture[player, pits - 1, remainder] & (board[rows, last] == 1)
+        if capture.any():
+            c = np.flatnonzero(capture)
+            opposite = 2 * P - last[c]
+            captured = board[c, opposite]
+            board[c, opposite] = 0
+            board[c, last[c]] = 0
+            board[c, own_mancala[c]] += 1 + captured
+
+        self.board[games] = board
+        self.current_player[games] = 3 - self.current_player[games]
+        self.num_moves[games] += 1
+
+    def random_moves(self, games, rng):
+        """
+        Uniformly random valid pit (1-indexed) for each game in games
+        """
+        mask = self.valid_mask(games)
+        return np.argmax(rng.random(mask.shape) * mask, axis=1) + 1
+
+    def results(self):
+        """
+        returns: status (1/2/0 like PlayGames), p1 scores, p2 scores, num_moves as arrays
+        """
+        p1_score = self.board[:, self.p1_mancala_index]
+        p2_score = self.board[:, self.p2_mancala_index]
+        status = np.where(p1_score > p2_score, 1, np.where(p1_score < p2_score, 2, 0))
+        return status, p1_score, p2_score, self.num_moves
+
+
+def play_random_games(n_games, seed=None, max_moves=500, pits_per_player=6, stones_per_pit=4, record_moves=False, chunk_size=1 << 15):
+    """
+    Plays n_games random vs random games in lock step.
+    record_moves: also return an (n_games, max_moves) array of the pits played (0 after a game ends)
+    chunk_size: games are stepped chunk by chunk so the working arrays stay in cache
+    returns: BatchMancala with the finished games (and the moves array if record_moves)
+    """
+    rng = np.random.default_rng(seed)
+    batch = BatchMancala(n_games, pits_per_player, stones_per_pit)
+    moves = np.zeros((n_games, max_moves), dtype=np.int8) if record_moves else None
+    for start in range(0, n_games, chunk_size):
+        games = np.arange(start, min(start + chunk_size, n_games))
+        step = 0
+        while True:
+            # Same stopping rule as PlayGames: winning_eval first, then the move cap
+            done = batch.winning_eval(games)
+            games = games[~done[games]]
+            if step == max_moves or len(games) == 0:
+                break
+            pits = batch.random_moves(games, rng)
+            if record_moves:
+                moves[games, step] = pits
+            batch.play(games, pits)
+            step += 1
+    if record_moves:
+        return batch, moves
+    return batch
@@ -0,0 +1,262 @@
+import contextlib
+import json
+import platform
+import random
+import sys
+import time
+from MancalaGame import Mancala
+from MinimaxAI import MinimaxAI
+from ABPruningAI import ABPruningAI
+from ABModifiedHeuristicAI import ABModifiedHeuristicAI
+from SearchHelpers import SearchStats
+
+AI_CLASSES = {
+    'minimax': MinimaxAI,
+    'abpruning': ABPruningAI,
+    'abmodified': ABModifiedHeuristicAI,
+}
+DEFAULT_DEPTHS = (2, 5, 8, 10)
+# Plain minimax takes minutes per move at depth 10, it is only benchmarked up to this depth unless asked
+MINIMAX_MAX_DEPTH = 8
+
+def benchmark_positions(count=6, seed=2024):
+    """
+    Fixed corpus of mid-game positions: the start plus positions after a seeded number of random moves
+    returns: list of (board, current_player)
+    """
+    rng = random.Random(seed)
+    positions = [(Mancala().board, 1)]
+    while len(positions) < count:
+        game = Mancala()
+        for _ in range(rng.randint(4, 30)):
+            game.play(game.random_move_generator(rng))
+            if game.winning_eval():
+                break
+        if not game.winning_eval():
+            positions.append((list(game.board), game.current_player))
+    return positions
+
+
+def random_game_moves(count, seed=2024):
+    """
+    Move lists of count seeded random games, to replay without the cost of choosing moves
+    """
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = Mancala()
+        moves = []
+        while not game.winning_eval():
+            move = game.random_move_generator(rng)
+            game.play(move)
+            moves.append(move)
+        games.append(moves)
+    return games
+
+
+def best_of(repeats, fn):
+    """
+    Fastest of repeats timed calls of fn (the least disturbed by other load)
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def metric(value, unit, better):
+    """
+    better: "higher" or "lower" for metrics compared against a baseline, None for information only
+    """
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def bench_engine(repeats=5, num_games=200):
+    """
+    Mancala.play moves/sec, and the cost of get_valid_moves, is_terminal and winning_eval
+    """
+    games = random_game_moves(num_games)
+    total_moves = sum(len(moves) for moves in games)
+
+    def replay():
+        for moves in games:
+            game = Mancala()
+            for move in moves:
+                game.play(move)
+    seconds = best_of(repeats, replay)
+
+    # A game object in every position reached in the replayed games (none of them finished, so winning_eval doesn't sweep)
+    positions = []
+    for moves in games:
+        game = Mancala()
+        for move in moves[:-1]:
+            game.play(move)
+            probe = Mancala()
+            probe.board = game.board[:]
+            probe.current_player = game.current_player
+            probe.count_sides()
+            positions.append(probe)
+
+    def valid_moves():
+        for probe in positions:
+            probe.get_valid_moves()
+
+    def is_terminal():
+        for probe in positions:
+            probe.is_terminal()
+
+    def winning_eval():
+        for probe in positions:
+            probe.winning_eval()
+    valid_seconds = best_of(repeats, valid_moves)
+    terminal_seconds = best_of(repeats, is_terminal)
+    eval_seconds = best_of(repeats, winning_eval)
+    return {
+        'engine.play': metric(total_moves / seconds, "moves/s", "higher"),
+        'engine.get_valid_moves': metric(valid_seconds / len(positions) * 1e9, "ns/call", "lower"),
+        'engine.is_terminal': metric(terminal_seconds / len(positions) * 1e9, "ns/call", "lower"),
+        'engine.winning_eval': metric(eval_seconds / len(positions) * 1e9, "ns/call", "lower"),
+    }
+
+
+def bench_search(ai_types=('minimax', 'abpruning', 'abmodified'), depths=DEFAULT_DEPTHS, positions=None, minimax_max_depth=MINIMAX_MAX_DEPTH, verbose=False):
+    """
+    Time-to-move and nodes/sec of each AI at each depth over the position corpus.
+    Nodes are counted with SearchStats in a second, untimed run
+    """
+    positions = positions if positions is not None else benchmark_positions()
+    results = {}
+    for ai_type in ai_types:
+        ai_class = AI_CLASSES[ai_type]
+        for depth in depths:
+            if ai_type == 'minimax' and depth > minimax_max_depth:
+                continue
+            times = []
+            nodes = 0
+            for board, player in positions:
+                game = Mancala()
+                game.board = list(board)
+                game.current_player = player
+                choose = lambda: ai_class(game, player, depth).choose_move()
+                seconds = best_of(1, choose)
+                if seconds < 0.05:
+                    # Fast moves are timed repeatedly (about 0.1s worth) to cut the noise
+                    seconds = min(seconds, best_of(min(1000, max(5, int(0.1 / seconds))), choose))
+                times.append(seconds)
+                stats = SearchStats()
+                ai_class(game, player, depth, stats=stats).choose_move()
+                nodes += stats.nodes
+            name = f"search.{ai_type}.d{depth}"
+            results[name + ".ms_per_move"] = metric(sum(times) / len(times) * 1000, "ms", "lower")
+            results[name + ".max_ms_per_move"] = metric(max(times) * 1000, "ms", None)
+            results[name + ".nodes_per_s"] = metric(nodes / sum(times), "nodes/s", "higher")
+            results[name + ".nodes"] = metric(nodes, "nodes", None)
+            if verbose:
+                print(f"{name}: {sum(times) / len(times) * 1000:.1f} ms/move, {nodes / sum(times):,.0f} nodes/s", file=sys.stderr)
+    return results
+
+
+def bench_playgames(matchups=(('random', 'random', 5, 500), ('abpruning', 'random', 5, 20))):
+    """
+    Full-game throughput of PlayGames.play_game for (p1type, p2type, depth, games)
+    """
+    from PlayGames import PlayGames
+    results = {}
+    for p1type, p2type, depth, num_games in matchups:
+        with contextlib.redirect_stdout(sys.stderr):   # Keep stdout for the JSON report
+            runner = PlayGames(p1type, p2type, num_games, depth, seed=1)
+        start = time.perf_counter()
+        for game_num in range(1, num_games + 1):
+            runner.play_game(game_num)
+        seconds = time.perf_counter() - start
+        results[f"playgames.{p1type}_vs_{p2type}.d{depth}"] = metric(num_games / seconds, "games/s", "higher")
+    return results
+
+
+def run_benchmarks(quick=False, depths=None, minimax_max_depth=MINIMAX_MAX_DEPTH, verbose=False):
+    """
+    Runs every benchmark. quick: fewer positions, repeats and games, depths 2 and 5 only
+    returns: {'meta': {...}, 'results': {name: {'value', 'unit', 'better'}}}
+    """
+    if depths is None:
+        depths = (2, 5) if quick else DEFAULT_DEPTHS
+    results = {}
+    results.update(bench_engine(repeats=2 if quick else 5, num_games=50 if quick else 200))
+    results.update(bench_search(depths=depths, positions=benchmark_positions(3 if quick else 6),
+                                minimax_max_depth=minimax_max_depth, verbose=verbose))
+    if quick:
+        results.update(bench_playgames((('random', 'random', 5, 100), ('abpruning', 'random', 5, 5))))
+    else:
+        results.update(bench_playgames())
+    meta = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'quick': quick,
+        'depths': list(depths),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compares two run_benchmarks reports. A metric regresses when it is worse than the baseline by more than
+    threshold (relative). Metrics missing from either report or with better=None are not compared.
+    returns: (regressions, lines) where lines describe every compared metric
+    """
+    regressions = []
+    lines = []
+    for name, new in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None or new['better'] is None or old['value'] == 0:
+            continue
+        change = (new['value'] - old['value']) / old['value']
+        worse = -change if new['better'] == "higher" else change
+        flag = "REGRESSION" if worse > threshold else "improved" if -worse > threshold else ""
+        lines.append(f"{name:45} {old['value']:>14,.2f} -> {new['value']:>14,.2f} {new['unit']:9} {change:+7.1%} {flag}")
+        if flag == "REGRESSION":
+            regressions.append(name)
+    return regressions, lines
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the Mancala engine and AIs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and write a JSON report")
+    run_parser.add_argument("--out", help="JSON report path (stdout if not set)")
+    run_parser.add_argument("--quick", action="store_true")
+    run_parser.add_argument("--depths", type=int, nargs="+")
+    run_parser.add_argument("--minimax-max-depth", type=int, default=MINIMAX_MAX_DEPTH)
+    run_parser.add_argument("--baseline", help="also compare against this report")
+    run_parser.add_argument("--threshold", type=float, default=0.10)
+    compare_parser = subparsers.add_parser("compare", help="compare two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_benchmarks(args.quick, args.depths, args.minimax_max_depth, verbose=True)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=1)
+        else:
+            print(json.dumps(report, indent=1))
+        baseline_path = args.baseline
+    else:
+        with open(args.current) as f:
+            report = json.load(f)
+        baseline_path = args.baseline
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions, lines = compare(baseline, report, args.threshold)
+        print("\n".join(lines), file=sys.stderr)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
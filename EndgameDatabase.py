@@ -0,0 +1,201 @@
+import mmap
+import os
+import struct
+import sys
+from math import comb
+from GameState import GameState, successor
+
+MAGIC = b"MNCLEGDB"
+HEADER = struct.Struct("<8sIIQ")    # magic, pits_per_player, max_stones, number of positions
+UNSOLVED = -128
+
+class EndgameDatabase:
+    def __init__(self, path):
+        """
+        Read-only, memory-mapped endgame database written by EndgameDatabase.build.
+
+        For every split of up to max_stones stones over the 2*pits_per_player pits it stores the exact value of the
+        position for the player to move: (stones that player still gets into their mancala) - (stones the opponent
+        still gets), with perfect play under Mancala.play rules. Mancala contents don't matter for that value,
+        and positions are stored from the mover's point of view, so one entry covers both sides to move.
+        The mapping is opened lazily and reopened (not copied) when the object is pickled into a worker process,
+        so all processes share the OS page cache.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            magic, self.pits_per_player, self.max_stones, self.size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an endgame database")
+        self.ranker = PositionRanker(self.pits_per_player, self.max_stones)
+        self.data = None
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def value(self, pits):
+        """
+        Exact value for the player to move, pits = mover's pits followed by the opponent's pits
+        """
+        if self.data is None:
+            self._open()
+        value = self.data[HEADER.size + self.ranker.rank(pits)]
+        return value - 256 if value > 127 else value
+
+    def covers(self, stones_in_pits):
+        return stones_in_pits <= self.max_stones
+
+    def probe(self, game):
+        """
+        Exact value for game.current_player of a Mancala (or GameState) position with at most max_stones stones in the pits
+        """
+        board = game.board
+        P = self.pits_per_player
+        if game.current_player == 1:
+            return self.value(board[0:P] + board[P+1:2*P+1])
+        return self.value(board[P+1:2*P+1] + board[0:P])
+
+    def final_score_diff(self, game, player):
+        """
+        Exact final (player's mancala - opponent's mancala) of a covered position with perfect play from here
+        """
+        board = game.board
+        P = self.pits_per_player
+        value = self.probe(game)
+        if game.current_player != player:
+            value = -value
+        diff = board[P] - board[2*P+1]
+        return value + (diff if player == 1 else -diff)
+
+    def iter_positions(self):
+        """
+        Yields (pits, value) for every stored position, e.g. to check heuristics against ground truth
+        """
+        for total in range(self.max_stones + 1):
+            for pits in self.ranker.compositions(total):
+                yield pits, self.value(pits)
+
+    @staticmethod
+    def build(path, pits_per_player=6, max_stones=10, verbose=False):
+        """
+        Solves every position with up to max_stones stones in the pits and writes the database to path.
+
+        Stones never leave a mancala, so the stones in the pits never increase. Positions are solved in order of
+        increasing stone count, so every move that scores or captures leads to an already solved entry. Moves that keep
+        the same count only push the mover's stones forward on their own side and can't cycle, so those are solved
+        recursively within the same layer.
+        Values are stored as signed bytes (-127..127, -128 marks unsolved), so max_stones is at most 127.
+        """
+        if not 0 <= max_stones <= 127:
+            raise ValueError("max_stones must be between 0 and 127, values are stored in one signed byte")
+        solver = _Solver(pits_per_player, max_stones)
+        # The within-layer recursion can be as deep as the longest chain of same-count moves
+        recursion_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(recursion_limit, 10000))
+        try:
+            for total in range(max_stones + 1):
+                for pits in solver.ranker.compositions(total):
+                    solver.solve(pits)
+                if verbose:
+                    print(f"Solved positions with {total} stones")
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, pits_per_player, max_stones, solver.ranker.size))
+            f.write(solver.values)
+        os.replace(tmp_path, path)
+        return EndgameDatabase(path)
+
+
+class PositionRanker:
+    def __init__(self, pits_per_player, max_stones):
+        """
+        Combinatorial ranking of pit contents: all splits of 0..max_stones stones over n = 2*pits_per_player pits
+        map onto 0..size-1. Splits are ordered by stone count, then by the colex rank of their stars-and-bars
+        combination (bar j sits at position x_1+...+x_j + j-1).
+        """
+        self.n = 2 * pits_per_player
+        self.max_stones = max_stones
+        # offset[s]: number of splits with fewer than s stones
+        self.offset = [comb(s + self.n - 1, self.n) for s in range(max_stones + 2)]
+        self.size = self.offset[max_stones + 1]
+        self.binom = [[comb(c, j) for j in range(self.n)] for c in range(max_stones + self.n)]
+
+    def rank(self, pits):
+        binom = self.binom
+        rank = 0
+        position = 0
+        for j in range(1, self.n):
+            position += pits[j-1]
+            rank += binom[position + j - 1][j]
+        return self.offset[position + pits[-1]] + rank
+
+    def compositions(self, total, n=None):
+        """
+        All splits of total stones over n pits (default all pits), as lists
+        """
+        n = self.n if n is None else n
+        if n == 1:
+            yield [total]
+            return
+        for first in range(total + 1):
+            for rest in self.compositions(total - first, n - 1):
+                yield [first] + rest
+
+
+class _Solver:
+    def __init__(self, pits_per_player, max_stones):
+        self.P = pits_per_player
+        self.ranker = PositionRanker(pits_per_player, max_stones)
+        self.values = bytearray([UNSOLVED & 0xFF]) * self.ranker.size
+
+    def get(self, rank):
+        value = self.values[rank]
+        return value - 256 if value > 127 else value
+
+    def solve(self, pits):
+        """
+        Value for the mover of pits (mover's pits then the opponent's), solving same-count successors on the way
+        """
+        rank = self.ranker.rank(pits)
+        value = self.get(rank)
+        if value != UNSOLVED:
+            return value
+
+        P = self.P
+        own = sum(pits[0:P])
+        opp = sum(pits[P:])
+        if own == 0 or opp == 0:
+            # Game over, remaining stones are swept into each side's mancala
+            value = own - opp
+        else:
+            value = None
+            # Position from the mover's side as player 1, with empty mancalas; moves follow GameState.successor
+            state = GameState(pits[0:P] + [0] + pits[P:] + [0], 1)
+            for pit in range(1, P + 1):
+                if pits[pit - 1] == 0:
+                    continue
+                board = successor(state, pit).board
+                # Opponent moves next, from their point of view
+                score = board[P] - self.solve(list(board[P+1:2*P+1] + board[0:P]))
+                if value is None or score > value:
+                    value = score
+        self.values[rank] = value & 0xFF
+        return value
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build a Mancala endgame database")
+    parser.add_argument("path")
+    parser.add_argument("--pits", type=int, default=6)
+    parser.add_argument("--stones", type=int, default=10)
+    args = parser.parse_args()
+    EndgameDatabase.build(args.path, args.pits, args.stones, verbose=True)
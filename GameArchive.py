@@ -0,0 +1,423 @@
+import json
+import mmap
+import os
+import struct
+from MancalaGame import Mancala
+from TranspositionTable import ZobristHasher
+
+MAGIC = b"MNCLGARC"
+HEADER = struct.Struct("<8sIII")        # magic, pits_per_player, stones_per_pit, length of the JSON config after it
+GAME = struct.Struct("<QH")             # seed, number of moves, followed by the moves
+OFFSET = struct.Struct("<Q")            # start of a game in the archive, one per game in path + ".offsets"
+MAX_MOVES = (1 << 16) - 1
+
+INDEX_MAGIC = b"MNCLGIDX"
+INDEX_HEADER = struct.Struct("<8sIIIQQ")    # magic, pits_per_player, stones_per_pit, bucket bits, games, entries
+ENTRY = struct.Struct(">QIH")               # position key, game, ply. Big-endian, so the raw bytes sort by key
+# Folded into the key of positions with player 2 to move
+P2_TO_MOVE = 0x9E3779B97F4A7C15
+
+def offsets_path(path):
+    return path + ".offsets"
+
+
+def packs_nibbles(pits_per_player):
+    """
+    Moves are stored two per byte (pits 1..15, 0 pads an odd count) on boards with up to 15 pits a side,
+    one per byte otherwise
+    """
+    return pits_per_player <= 15
+
+
+def encode_moves(moves, nibbles):
+    if not nibbles:
+        return bytes(moves)
+    if len(moves) % 2:
+        moves = list(moves) + [0]
+    return bytes(moves[i] << 4 | moves[i + 1] for i in range(0, len(moves), 2))
+
+
+def decode_moves(data, num_moves, nibbles):
+    if not nibbles:
+        return list(data[:num_moves])
+    moves = []
+    for byte in data[:(num_moves + 1) // 2]:
+        moves.append(byte >> 4)
+        moves.append(byte & 15)
+    return moves[:num_moves]
+
+
+def moves_size(num_moves, nibbles):
+    return (num_moves + 1) // 2 if nibbles else num_moves
+
+
+def read_header(f):
+    """
+    (pits_per_player, stones_per_pit, config, start of the first game) of an archive file
+    """
+    header = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{f.name} is not a game archive")
+    _, pits_per_player, stones_per_pit, config_size = HEADER.unpack(header)
+    config = json.loads(f.read(config_size))
+    return pits_per_player, stones_per_pit, config, HEADER.size + config_size
+
+
+class GameArchiveWriter:
+    def __init__(self, path, pits_per_player=6, stones_per_pit=4, config=None, resume=False, checkpoint_every=1000, overwrite=False):
+        """
+        Append-only archive of whole games: each game is its seed and its move sequence, one nibble per move
+        (one byte on boards with more than 15 pits a side), after a header with the board size and a JSON config.
+        A game of 50 moves takes 35 bytes, so tens of millions of games fit in a few hundred MB.
+        Next to it, path + ".offsets" holds the start of every game (8 bytes each) for random access.
+
+        config: JSON-able description of the run (e.g. PlayGames.run_config), so a game can be replayed from its seed
+        resume: append to an existing archive. Games after the last checkpoint (e.g. half written by a crash) are cut off
+        overwrite: replace an existing non-empty archive when not resuming, instead of raising FileExistsError
+        checkpoint_every: the files are flushed to disk every this many games; the offsets file is only written after
+                          the games it points to, so it never counts a game that isn't complete on disk
+        """
+        self.path = path
+        self.nibbles = packs_nibbles(pits_per_player)
+        self.checkpoint_every = checkpoint_every
+        self.since_checkpoint = 0
+        self.pending_offsets = bytearray()
+        if resume and os.path.exists(path):
+            with open(path, "rb") as f:
+                archive_pits, archive_stones, archive_config, start = read_header(f)
+            if (archive_pits, archive_stones) != (pits_per_player, stones_per_pit) or archive_config != (config or {}):
+                raise ValueError(f"{path} was written by a different run: {archive_config}")
+            with open(offsets_path(path), "rb") as f:
+                offsets = f.read()
+            self.games = len(offsets) // OFFSET.size
+            self.file = open(path, "r+b")
+            self.offsets = open(offsets_path(path), "r+b")
+            end = start
+            if self.games:
+                # End of the last complete game
+                last = OFFSET.unpack_from(offsets, (self.games - 1) * OFFSET.size)[0]
+                self.file.seek(last)
+                num_moves = GAME.unpack(self.file.read(GAME.size))[1]
+                end = last + GAME.size + moves_size(num_moves, self.nibbles)
+            self.truncate_files(end)
+        else:
+            if not overwrite and os.path.exists(path) and os.path.getsize(path) > 0:
+                raise FileExistsError(f"{path} holds another archive, pass resume=True to continue it or overwrite=True to replace it")
+            self.games = 0
+            self.file = open(path, "wb")
+            self.offsets = open(offsets_path(path), "wb")
+            config_data = json.dumps(config or {}).encode()
+            self.file.write(HEADER.pack(MAGIC, pits_per_player, stones_per_pit, len(config_data)))
+            self.file.write(config_data)
+            self.checkpoint()
+
+    def truncate_files(self, end):
+        self.file.truncate(end)
+        self.file.seek(end)
+        self.offsets.truncate(self.games * OFFSET.size)
+        self.offsets.seek(self.games * OFFSET.size)
+
+    def truncate(self, games):
+        """
+        Drops every game after the first games, e.g. to line the archive up with a results file resumed from an
+        earlier checkpoint
+        """
+        if games > self.games:
+            raise ValueError(f"{self.path} only holds {self.games} games")
+        if games < self.games:
+            self.checkpoint()
+            with open(offsets_path(self.path), "rb") as f:
+                f.seek(games * OFFSET.size)
+                end = OFFSET.unpack(f.read(OFFSET.size))[0]
+            self.games = games
+            self.truncate_files(end)
+            self.checkpoint()
+
+    def write(self, seed, moves):
+        """
+        Appends the next game: the seed it was played with (None for 0) and its pits played in order
+        """
+        if len(moves) > MAX_MOVES:
+            raise ValueError(f"games of more than {MAX_MOVES} moves can't be archived")
+        self.pending_offsets += OFFSET.pack(self.file.tell())
+        self.file.write(GAME.pack(seed or 0, len(moves)))
+        self.file.write(encode_moves(moves, self.nibbles))
+        self.games += 1
+        self.since_checkpoint += 1
+        if self.since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        # Offsets of the games written since the last checkpoint, now that the games are on disk
+        self.offsets.write(self.pending_offsets)
+        self.pending_offsets.clear()
+        self.offsets.flush()
+        os.fsync(self.offsets.fileno())
+        self.since_checkpoint = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.checkpoint()
+            self.file.close()
+            self.offsets.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameArchive:
+    def __init__(self, path):
+        """
+        Read-only view of an archive written by GameArchiveWriter. Games are numbered from 0 in the order they
+        were written (PlayGames game n is game n - 1 of a run archived from the start).
+        Both files are memory-mapped on first use and reopened (not copied) when the object is pickled into a worker
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.pits_per_player, self.stones_per_pit, self.config, self.start = read_header(f)
+        self.nibbles = packs_nibbles(self.pits_per_player)
+        self.games = os.path.getsize(offsets_path(path)) // OFFSET.size
+        self.data = None
+        self.offsets = None
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.games:
+            with open(offsets_path(self.path), "rb") as f:
+                self.offsets = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.games
+
+    def game(self, index):
+        """
+        (seed, pits played) of game index
+        """
+        if not 0 <= index < self.games:
+            raise IndexError(f"game {index} not in archive of {self.games} games")
+        if self.data is None:
+            self._open()
+        offset = OFFSET.unpack_from(self.offsets, index * OFFSET.size)[0]
+        seed, num_moves = GAME.unpack_from(self.data, offset)
+        start = offset + GAME.size
+        return seed, decode_moves(self.data[start:start + moves_size(num_moves, self.nibbles)], num_moves, self.nibbles)
+
+    def replay(self, index, ply=None):
+        """
+        Mancala game of game index after its first ply moves (all of them by default; the end-of-game sweep
+        is left to winning_eval as in a live game)
+        """
+        game = Mancala(self.pits_per_player, self.stones_per_pit)
+        for pit in self.game(index)[1][:ply]:
+            game.play(pit)
+        return game
+
+    def __iter__(self):
+        """
+        Yields (seed, pits played) of every game in order, reading the archive sequentially in large chunks
+        (no offsets needed, so memory use is flat)
+        """
+        with open(self.path, "rb") as f:
+            f.seek(self.start)
+            buffer = b""
+            position = 0
+            for _ in range(self.games):
+                if len(buffer) - position < GAME.size:
+                    buffer = buffer[position:] + f.read(1 << 20)
+                    position = 0
+                seed, num_moves = GAME.unpack_from(buffer, position)
+                size = GAME.size + moves_size(num_moves, self.nibbles)
+                if len(buffer) - position < size:
+                    buffer = buffer[position:] + f.read(max(1 << 20, size))
+                    position = 0
+                yield seed, decode_moves(buffer[position + GAME.size:position + size], num_moves, self.nibbles)
+                position += size
+
+
+def position_key(keys, player):
+    """
+    Index key of a position: its Zobrist key in player 1's frame, with the side to move folded in
+    (unlike the transposition table, a position and its mirror image are different positions here)
+    """
+    return keys[0] if player == 1 else keys[0] ^ P2_TO_MOVE
+
+
+class PositionIndex:
+    def __init__(self, path):
+        """
+        Read-only, memory-mapped index of the positions in a GameArchive, written by PositionIndex.build:
+        for every position key, the (game, ply) of each time it arose, game and ply in archive order.
+        Entries are grouped in 2**bucket_bits buckets by the key's top bits and sorted by key inside each bucket,
+        so a lookup is a binary search in one bucket
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            (magic, self.pits_per_player, self.stones_per_pit, self.bucket_bits, self.games,
+             self.entries) = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"{path} is not a position index")
+            table = f.read(((1 << self.bucket_bits) + 1) * OFFSET.size)
+        self.buckets = [offset for offset, in OFFSET.iter_unpack(table)]
+        self.start = INDEX_HEADER.size + len(table)
+        self.hasher = ZobristHasher((self.pits_per_player + 1) * 2)
+        self.data = None
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def lookup(self, game):
+        """
+        (game, ply) of every time the position of game (a Mancala or GameState, board and player to move) arose
+        in the archive: game `game` of the archive after `ply` moves. Matching is by 64-bit key, so a false match is
+        possible but very unlikely; GameArchive.replay(game, ply) shows the actual position
+        """
+        if self.data is None:
+            self._open()
+        key = position_key(self.hasher.hash(game), game.current_player)
+        target = key.to_bytes(8, "big")
+        bucket = key >> (64 - self.bucket_bits) if self.bucket_bits else 0
+        low, high = self.buckets[bucket], self.buckets[bucket + 1]
+        data = self.data
+        start = self.start
+        # First entry with a key >= target
+        while low < high:
+            middle = (low + high) // 2
+            position = start + middle * ENTRY.size
+            if data[position:position + 8] < target:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        end = self.buckets[bucket + 1]
+        while low < end:
+            entry_key, game_index, ply = ENTRY.unpack_from(data, start + low * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((game_index, ply))
+            low += 1
+        return found
+
+    def count(self, game):
+        """
+        How often the position of game arose in the archive
+        """
+        return len(self.lookup(game))
+
+    @staticmethod
+    def build(archive_path, path, bucket_bits=8, min_ply=1, verbose=False):
+        """
+        Indexes every position of the archive at archive_path from ply min_ply on (ply 0 is the starting position,
+        in every game) in one sequential pass, and writes the index to path.
+
+        The pass replays each game with incremental Zobrist keys and appends its entries to a temporary file per
+        bucket. Each bucket is then sorted on its own and copied into the index, so memory use is bounded by the
+        largest bucket (about 14 bytes per entry / 2**bucket_bits), not by the archive. Raise bucket_bits for
+        very large archives.
+        """
+        archive = GameArchive(archive_path)
+        if len(archive) >= 1 << 32:
+            raise ValueError("the index holds game numbers of up to 32 bits")
+        num_buckets = 1 << bucket_bits
+        shift = 64 - bucket_bits
+        hasher = ZobristHasher((archive.pits_per_player + 1) * 2)
+        start_keys = hasher.hash(Mancala(archive.pits_per_player, archive.stones_per_pit))
+        bucket_paths = [f"{path}.bucket{bucket}" for bucket in range(num_buckets)]
+        buffers = [bytearray() for _ in range(num_buckets)]
+        counts = [0] * num_buckets
+
+        def flush(bucket):
+            with open(bucket_paths[bucket], "ab") as f:
+                f.write(buffers[bucket])
+            buffers[bucket].clear()
+
+        try:
+            for game_index, (_, moves) in enumerate(archive):
+                game = Mancala(archive.pits_per_player, archive.stones_per_pit)
+                keys = start_keys
+                for ply, pit in enumerate(moves, 1):
+                    old_board = game.board[:]
+                    game.play(pit)
+                    keys = hasher.update(keys, old_board, game.board)
+                    if ply < min_ply:
+                        continue
+                    key = position_key(keys, game.current_player)
+                    bucket = key >> shift if bucket_bits else 0
+                    buffers[bucket] += ENTRY.pack(key, game_index, ply)
+                    counts[bucket] += 1
+                    if len(buffers[bucket]) >= 1 << 20:
+                        flush(bucket)
+                if verbose and (game_index + 1) % 100000 == 0:
+                    print(f"Indexed {game_index + 1}/{len(archive)} games")
+
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, archive.pits_per_player, archive.stones_per_pit, bucket_bits,
+                                          len(archive), sum(counts)))
+                first = 0
+                for count in counts:
+                    f.write(OFFSET.pack(first))
+                    first += count
+                f.write(OFFSET.pack(first))
+                for bucket in range(num_buckets):
+                    data = bytes(buffers[bucket])
+                    if os.path.exists(bucket_paths[bucket]):
+                        with open(bucket_paths[bucket], "rb") as bucket_file:
+                            data = bucket_file.read() + data
+                    # Sorting the raw big-endian entries orders them by key, then game, then ply
+                    entries = [data[i:i + ENTRY.size] for i in range(0, len(data), ENTRY.size)]
+                    entries.sort()
+                    f.write(b"".join(entries))
+                    buffers[bucket] = None
+            os.replace(tmp_path, path)
+        finally:
+            for bucket_path in bucket_paths:
+                if os.path.exists(bucket_path):
+                    os.remove(bucket_path)
+        return PositionIndex(path)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Index the positions of a game archive, or query an index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    index_parser = subparsers.add_parser("index", help="build the position index of an archive")
+    index_parser.add_argument("archive")
+    index_parser.add_argument("index")
+    index_parser.add_argument("--bucket-bits", type=int, default=8)
+    index_parser.add_argument("--min-ply", type=int, default=1)
+    replay_parser = subparsers.add_parser("replay", help="print a game of an archive move by move")
+    replay_parser.add_argument("archive")
+    replay_parser.add_argument("game", type=int)
+    args = parser.parse_args()
+
+    if args.command == "index":
+        index = PositionIndex.build(args.archive, args.index, args.bucket_bits, args.min_ply, verbose=True)
+        print(f"{index.entries} positions of {index.games} games in {args.index}")
+    else:
+        archive = GameArchive(args.archive)
+        seed, moves = archive.game(args.game)
+        print(f"Game {args.game}, seed {seed}, {len(moves)} moves, run {archive.config}")
+        game = Mancala(archive.pits_per_player, archive.stones_per_pit)
+        for ply, pit in enumerate(moves, 1):
+            player = game.current_player
+            game.play(pit)
+            print(f"{ply:>4} P{player} pit {pit}: {game.board}")
@@ -0,0 +1,165 @@
+import json
+import os
+import struct
+
+FORMATS = ("csv", "binary")
+CSV_HEADER = b"status,p1_score,p2_score,num_moves\n"    # Same columns as the CSVs in DATA/
+MAGIC = b"MNCLRSLT"
+HEADER = struct.Struct("<8sI")          # magic, record size
+RECORD = struct.Struct("<BHHI")         # status, p1_score, p2_score, num_moves
+NUMPY_DTYPE = [('status', '<u1'), ('p1_score', '<u2'), ('p2_score', '<u2'), ('num_moves', '<u4')]
+
+def manifest_path(path):
+    return path + ".manifest.json"
+
+
+def read_manifest(path):
+    """
+    Checkpoint manifest of the results file at path, or None if there is none
+    """
+    try:
+        with open(manifest_path(path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class ResultWriter:
+    def __init__(self, path, format="csv", config=None, resume=False, checkpoint_every=100, overwrite=False):
+        """
+        Append-only per-game results file with a checkpoint manifest (path + ".manifest.json").
+
+        format: "csv" (same columns as DATA/*.csv) or "binary" (fixed-size little-endian records after a small header,
+                read back column by column with read_results(path, as_arrays=True))
+        config: JSON-able description of the run, stored in the manifest. Resuming checks it matches
+        resume: continue after the last checkpointed game. Anything written after that checkpoint (e.g. a half-written
+                row from a crash) is cut off, so the file always holds exactly games 1..games_done
+        checkpoint_every: the file is flushed to disk and the manifest rewritten every this many games
+        overwrite: replace an existing non-empty file when not resuming it, instead of raising FileExistsError
+        Only a few counters are kept in memory, however many games are written.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}")
+        self.path = path
+        self.format = format
+        self.config = config or {}
+        self.checkpoint_every = checkpoint_every
+        self.games_done = 0
+        self.status_counts = {1: 0, 2: 0, 0: 0}
+
+        manifest = read_manifest(path)
+        if manifest is not None and resume:
+            if manifest['format'] != format or manifest['config'] != self.config:
+                raise ValueError(f"{path} was written by a different run: {manifest['config']}")
+            self.games_done = manifest['games_done']
+            self.status_counts = {int(status): count for status, count in manifest['status_counts'].items()}
+            self.file = open(path, "r+b")
+            self.file.truncate(manifest['bytes'])
+            self.file.seek(manifest['bytes'])
+        else:
+            if not overwrite and os.path.exists(path) and os.path.getsize(path) > 0:
+                raise FileExistsError(f"{path} holds results of another run, pass resume=True to continue it "
+                                      f"or overwrite=True to replace it")
+            self.file = open(path, "wb")
+            if format == "csv":
+                self.file.write(CSV_HEADER)
+            else:
+                self.file.write(HEADER.pack(MAGIC, RECORD.size))
+            self.checkpoint()
+        self.since_checkpoint = 0
+
+    def write(self, status, score, num_moves):
+        """
+        Appends the next game's (status, (p1_score, p2_score), num_moves)
+        """
+        p1_score, p2_score = score
+        if self.format == "csv":
+            self.file.write(f"{status},{p1_score},{p2_score},{num_moves}\n".encode())
+        else:
+            self.file.write(RECORD.pack(status, p1_score, p2_score, num_moves))
+        self.games_done += 1
+        self.status_counts[status] += 1
+        self.since_checkpoint += 1
+        if self.since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Flushes the results to disk, then records them in the manifest (written to a temporary file and renamed,
+        so a crash leaves either the old or the new manifest)
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        manifest = {
+            'format': self.format,
+            'config': self.config,
+            'games_done': self.games_done,
+            'bytes': self.file.tell(),
+            'status_counts': self.status_counts,
+        }
+        tmp_path = manifest_path(self.path) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, manifest_path(self.path))
+        self.since_checkpoint = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.checkpoint()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Games finished before an exception are complete rows, so they are kept
+        self.close()
+
+    def summary(self):
+        """
+        Totals over every game in the file, including the ones written before a resume
+        """
+        return {
+            'output': self.path,
+            'games': self.games_done,
+            'status_counts': dict(self.status_counts),
+        }
+
+
+def read_results(path, as_arrays=False):
+    """
+    Reads a results file (either format) back into the structure PlayGames.play_games returns without output:
+    {'status': [...], 'score': [(p1_score, p2_score), ...], 'num_moves': [...]}
+    as_arrays: for binary files, return NumPy arrays {'status', 'p1_score', 'p2_score', 'num_moves'} read straight
+               from the file instead (needs numpy)
+    A trailing partial row from an interrupted run is ignored.
+    """
+    with open(path, "rb") as f:
+        start = f.read(len(MAGIC))
+        binary = start == MAGIC
+        if as_arrays:
+            if not binary:
+                raise ValueError("as_arrays needs a binary results file")
+            import numpy as np   # Only needed for column reads
+            f.seek(HEADER.size)
+            records = np.fromfile(f, dtype=np.dtype(NUMPY_DTYPE))
+            return {name: records[name] for name, _ in NUMPY_DTYPE}
+
+        results = {'status': [], 'score': [], 'num_moves': []}
+        if binary:
+            f.seek(HEADER.size)
+            data = f.read()
+            for status, p1_score, p2_score, num_moves in RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]):
+                results['status'].append(status)
+                results['score'].append((p1_score, p2_score))
+                results['num_moves'].append(num_moves)
+        else:
+            f.seek(len(CSV_HEADER))
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                status, p1_score, p2_score, num_moves = map(int, line.split(b","))
+                results['status'].append(status)
+                results['score'].append((p1_score, p2_score))
+                results['num_moves'].append(num_moves)
+    return results
@@ -0,0 +1,514 @@
+import asyncio
+import itertools
+import json
+import multiprocessing
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from MancalaGame import Mancala
+from GameState import GameState
+from MinimaxAI import MinimaxAI
+from ABPruningAI import ABPruningAI
+from ABModifiedHeuristicAI import ABModifiedHeuristicAI
+from WeightedHeuristicAI import WeightedHeuristicAI, load_weights
+from MCTSAI import MCTSAI
+
+AI_TYPES = ("random", "minimax", "abpruning", "abmodified", "weighted", "mcts")
+AB_CLASSES = {
+    'abpruning': ABPruningAI,
+    'abmodified': ABModifiedHeuristicAI,
+    'weighted': WeightedHeuristicAI,
+}
+
+def _choose_move(task):
+    """
+    Move of a fresh AI in state, run in the worker processes
+    """
+    state, ptype, depth, time_limit_ms, playouts, seed, weights = task
+    game = state.to_mancala()
+    player = state.player
+    if ptype == "minimax":
+        ai = MinimaxAI(game, player, depth)
+    elif ptype == "mcts":
+        ai = MCTSAI(game, player, playouts, time_limit_ms, rng=random.Random(seed))
+    elif ptype == "weighted":
+        ai = WeightedHeuristicAI(game, player, depth, time_limit_ms=time_limit_ms, weights=weights)
+    else:
+        ai = AB_CLASSES[ptype](game, player, depth, time_limit_ms=time_limit_ms)
+    return ai.choose_move()
+
+
+def _warm_up():
+    return None
+
+
+class LatencyTracker:
+    def __init__(self, window=100000):
+        """
+        Latencies (seconds) of the last window events, for percentiles, plus a count and maximum over all of them
+        """
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q, ordered=None):
+        """
+        Nearest-rank q-th percentile (0 < q <= 100) of the window, in seconds
+        """
+        ordered = ordered if ordered is not None else sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * q // 100) - 1))]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+            'p50_ms': self.percentile(50, ordered) * 1000,
+            'p90_ms': self.percentile(90, ordered) * 1000,
+            'p99_ms': self.percentile(99, ordered) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+class Session:
+    def __init__(self, game: Mancala, human, ai, depth, time_limit_ms, playouts, deadline_ms, rng):
+        """
+        One game between a client (player human) and a server AI
+        """
+        self.game = game
+        self.human = human
+        self.ai = ai
+        self.depth = depth
+        self.time_limit_ms = time_limit_ms
+        self.playouts = playouts
+        self.deadline_ms = deadline_ms
+        self.rng = rng
+        self.over = False
+
+    def state(self):
+        game = self.game
+        state = {
+            'board': list(game.board),
+            'player': game.current_player,
+            'valid_moves': [] if self.over else game.get_valid_moves(),
+            'over': self.over,
+        }
+        if self.over:
+            state['score'] = [game.board[game.p1_mancala_index], game.board[game.p2_mancala_index]]
+        return state
+
+
+class RequestError(Exception):
+    """
+    Bad request, answered with {'ok': False, 'error': message}
+    """
+
+
+class GameServer:
+    def __init__(self, host="127.0.0.1", port=8765, workers=2, max_pending=None, max_queue=None, deadline_ms=5000,
+                 max_sessions=1000, max_depth=10, max_minimax_depth=6, max_playouts=100000, weights=None,
+                 latency_window=100000):
+        """
+        Mancala sessions for many clients over TCP, one JSON object per line each way. Requests ({"op": ..., "id": optional,
+        echoed back}):
+            {"op": "new", "ai": type, "depth": 5, "human": 1, "pits": 6, "stones": 4, "time_limit_ms": null,
+             "playouts": 1000, "deadline_ms": null, "seed": null}      -> {"session", "state"} (the AI moves first if human is 2)
+            {"op": "move", "session": id, "pit": 1..pits}             -> {"ai_move", "ai_ms", "fallback", "state"}
+            {"op": "state", "session": id} / {"op": "close", "session": id}
+            {"op": "stats"}                                           -> server counters and latency percentiles
+        Sessions belong to the connection that created them and end with it.
+
+        workers: AI moves (every type but random) run in a process pool of this size
+        max_pending: AI moves running or queued in the pool at once (workers by default); further moves wait their turn
+        max_queue: AI moves allowed to wait for a pool slot (max_pending * 4 by default). A move request arriving when the
+                   queue is full is answered {"ok": false, "error": "overloaded"} before the client's move is played,
+                   so the client can simply retry it later
+        deadline_ms: time allowed for an AI move, waiting included (a session may ask for less). A move that misses it
+                     is replaced by a random legal move (reported as "fallback": true, as are moves whose search failed
+                     or whose worker process died); the late search finishes unused
+        max_sessions: "new" requests beyond this many open sessions are refused
+        max_depth: largest search depth a session may ask for
+        max_minimax_depth: largest depth for minimax sessions, whose search doesn't prune
+        max_playouts: most playouts per move an mcts session may ask for
+        A session's time_limit_ms and deadline_ms are capped at deadline_ms. Searches can't be stopped from outside
+        and hold their pool slot until they finish, so these limits are what keeps a few clients from filling the pool
+        weights: feature weights of weighted AIs (dict or HeuristicTuning weights file)
+        """
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_pending = max_pending or workers
+        self.max_queue = max_queue if max_queue is not None else self.max_pending * 4
+        self.deadline_ms = deadline_ms
+        self.max_sessions = max_sessions
+        self.max_depth = max_depth
+        self.max_minimax_depth = max_minimax_depth
+        self.max_playouts = max_playouts
+        self.weights = load_weights(weights) if isinstance(weights, str) else weights
+        self.executor = None
+        self.server = None
+        self.slots = None
+        self.waiting = 0
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.connections = set()
+        self.started = None
+        self.latency = {'move': LatencyTracker(latency_window), 'new': LatencyTracker(latency_window)}
+        self.ai_latency = LatencyTracker(latency_window)
+        self.counters = {'requests': 0, 'errors': 0, 'overloaded': 0, 'refused_sessions': 0, 'ai_moves': 0,
+                         'fallbacks': 0, 'ai_errors': 0, 'games_finished': 0}
+
+    async def start(self):
+        """
+        Starts listening (port 0 picks a free port, self.port is set to the real one)
+        """
+        self.executor = self.new_executor()
+        # Worker start-up (a fresh interpreter importing the AIs) is paid here rather than by the first moves
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.workers)))
+        self.slots = asyncio.Semaphore(self.max_pending)
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started = time.perf_counter()
+
+    def new_executor(self):
+        # Forked workers would inherit the client sockets and keep closed connections open, so they are started clean
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+
+    def restart_pool(self, broken):
+        """
+        A worker died (e.g. killed for memory) and took the pool down: replaces it, once however many moves notice
+        """
+        self.counters['ai_errors'] += 1
+        if broken is self.executor:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.executor = self.new_executor()
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            for task in list(self.connections):
+                task.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves one connection: requests are answered one at a time in order, so a client that sends faster than it
+        is served is held back by TCP flow control
+        """
+        owned = set()
+        self.connections.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                self.counters['requests'] += 1
+                request = {}
+                try:
+                    parsed = json.loads(line)
+                    if not isinstance(parsed, dict):
+                        raise RequestError("request must be a JSON object")
+                    request = parsed
+                    response = await self.handle(request, owned)
+                    response['ok'] = True
+                except (RequestError, ValueError, TypeError) as error:
+                    self.counters['errors'] += 1
+                    response = {'ok': False, 'error': str(error)}
+                if 'id' in request:
+                    response['id'] = request['id']
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+                op = request.get('op')
+                if isinstance(op, str) and op in self.latency and response['ok']:
+                    self.latency[op].add(time.perf_counter() - start)
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass   # Dropped connection, a line over the stream limit, or the server closing
+        finally:
+            self.connections.discard(asyncio.current_task())
+            for session_id in owned:
+                self.sessions.pop(session_id, None)
+            writer.close()
+
+    async def handle(self, request, owned):
+        op = request.get('op')
+        if op == "new":
+            return await self.new_session(request, owned)
+        if op == "stats":
+            return self.stats()
+        session_id = request.get('session')
+        if session_id not in owned:
+            raise RequestError(f"no session {session_id} on this connection")
+        session = self.sessions[session_id]
+        if op == "move":
+            return await self.move(session, request.get('pit'))
+        if op == "state":
+            return {'state': session.state()}
+        if op == "close":
+            owned.discard(session_id)
+            del self.sessions[session_id]
+            return {}
+        raise RequestError(f"unknown op {op!r}")
+
+    async def new_session(self, request, owned):
+        if len(self.sessions) >= self.max_sessions:
+            self.counters['refused_sessions'] += 1
+            raise RequestError("too many sessions")
+        ai = request.get('ai', "abpruning")
+        if ai not in AI_TYPES:
+            raise RequestError(f"ai must be one of {AI_TYPES}")
+        depth = request.get('depth', 5)
+        human = request.get('human', 1)
+        pits = request.get('pits', 6)
+        stones = request.get('stones', 4)
+        playouts = request.get('playouts', 1000)
+        max_depth = self.max_minimax_depth if ai == "minimax" else self.max_depth
+        for name, value, low, high in (('depth', depth, 1, max_depth), ('human', human, 1, 2),
+                                       ('pits', pits, 1, 12), ('stones', stones, 1, 20),
+                                       ('playouts', playouts, 1, self.max_playouts)):
+            if not isinstance(value, int) or isinstance(value, bool) or not low <= value <= high:
+                raise RequestError(f"{name} must be an integer in {low}..{high}")
+        time_limit_ms = request.get('time_limit_ms')
+        deadline_ms = request.get('deadline_ms')
+        for name, value in (('time_limit_ms', time_limit_ms), ('deadline_ms', deadline_ms)):
+            if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool)
+                                      or not 1 <= value <= self.deadline_ms):
+                raise RequestError(f"{name} must be null or a number in 1..{self.deadline_ms}")
+        session = Session(Mancala(pits, stones), human, ai, depth, time_limit_ms, playouts,
+                          deadline_ms or self.deadline_ms, random.Random(request.get('seed')))
+        session_id = next(self.session_ids)
+        self.sessions[session_id] = session
+        owned.add(session_id)
+        response = {'session': session_id}
+        if human == 2:
+            response.update(await self.ai_move(session))
+        response['state'] = session.state()
+        return response
+
+    async def move(self, session: Session, pit):
+        game = session.game
+        if session.over:
+            raise RequestError("game over")
+        if game.current_player != session.human:
+            raise RequestError("not your turn")
+        if not isinstance(pit, int) or not game.valid_move(pit):
+            raise RequestError(f"invalid move {pit!r}")
+        if session.ai != "random" and self.waiting >= self.max_queue:
+            self.counters['overloaded'] += 1
+            raise RequestError("overloaded")
+        game.play(pit)
+        response = {}
+        if not self.finish_if_over(session):
+            response.update(await self.ai_move(session))
+        response['state'] = session.state()
+        return response
+
+    def finish_if_over(self, session: Session):
+        if session.game.winning_eval():
+            session.over = True
+            self.counters['games_finished'] += 1
+        return session.over
+
+    async def ai_move(self, session: Session):
+        """
+        Plays the AI's move in session, searched in the process pool within the session's deadline
+        """
+        game = session.game
+        start = time.perf_counter()
+        move = None
+        if session.ai == "random":
+            move = game.random_move_generator(session.rng)
+        else:
+            timeout = session.deadline_ms / 1000
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self.slots.acquire(), timeout)
+                acquired = True
+            except asyncio.TimeoutError:
+                acquired = False
+            finally:
+                self.waiting -= 1
+            if acquired:
+                executor = self.executor
+                task = (GameState.from_mancala(game), session.ai, session.depth, session.time_limit_ms,
+                        session.playouts, session.rng.randrange(2**32), self.weights)
+                try:
+                    future = asyncio.get_running_loop().run_in_executor(executor, _choose_move, task)
+                except BrokenProcessPool:
+                    self.slots.release()
+                    self.restart_pool(executor)
+                else:
+                    # The slot is freed when the worker is, even if the move was given up on before
+                    future.add_done_callback(lambda _: self.slots.release())
+                    try:
+                        move = await asyncio.wait_for(asyncio.shield(future), max(0.0, start + timeout - time.perf_counter()))
+                    except asyncio.TimeoutError:
+                        pass
+                    except BrokenProcessPool:
+                        self.restart_pool(executor)
+                    except Exception:
+                        # The client's move is already played, so a failed search still has to answer it
+                        self.counters['ai_errors'] += 1
+        fallback = move is None
+        if fallback:
+            self.counters['fallbacks'] += 1
+            move = game.random_move_generator(session.rng)
+        game.play(move)
+        elapsed = time.perf_counter() - start
+        self.counters['ai_moves'] += 1
+        self.ai_latency.add(elapsed)
+        self.finish_if_over(session)
+        return {'ai_move': move, 'ai_ms': elapsed * 1000, 'fallback': fallback}
+
+    def stats(self):
+        uptime = time.perf_counter() - self.started if self.started is not None else 0.0
+        return {
+            'sessions': len(self.sessions),
+            'waiting': self.waiting,
+            'uptime_s': uptime,
+            'ai_moves_per_s': self.counters['ai_moves'] / uptime if uptime else 0.0,
+            'counters': dict(self.counters),
+            'latency': {op: tracker.summary() for op, tracker in self.latency.items()},
+            'ai_latency': self.ai_latency.summary(),
+        }
+
+
+async def _request(reader, writer, request):
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def simulated_player(host, port, games, options, rng, move_latency, totals, retry_ms=20):
+    """
+    One load-generator client: plays games games on its own connection, random legal moves on its side
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(games):
+            response = await _request(reader, writer, dict(options, op="new", seed=rng.randrange(2**32)))
+            if not response['ok']:
+                totals['errors'] += 1
+                continue
+            session = response['session']
+            state = response['state']
+            start = time.perf_counter()
+            while not state['over']:
+                response = await _request(reader, writer, {'op': "move", 'session': session,
+                                                           'pit': rng.choice(state['valid_moves'])})
+                if not response['ok']:
+                    if response['error'] != "overloaded":
+                        raise RuntimeError(response['error'])
+                    totals['overloaded'] += 1
+                    await asyncio.sleep(retry_ms / 1000)
+                    continue
+                move_latency.add(time.perf_counter() - start)   # Retries after "overloaded" included
+                start = time.perf_counter()
+                totals['moves'] += 1
+                totals['fallbacks'] += response.get('fallback', False)
+                state = response['state']
+            totals['games'] += 1
+            await _request(reader, writer, {'op': "close", 'session': session})
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host="127.0.0.1", port=8765, clients=10, games=1, ai="abpruning", depth=3, seed=0, **options):
+    """
+    Simulates clients concurrent players against a running server, each playing games games
+    options: extra "new" request fields (human, time_limit_ms, deadline_ms, playouts, pits, stones)
+    returns: {'clients', 'games', 'moves', 'seconds', 'moves_per_s', 'games_per_s', 'overloaded', 'fallbacks', 'errors',
+              'latency' (client-side round trip of move requests), 'server' (the server's stats afterwards)}
+    """
+    rng = random.Random(seed)
+    move_latency = LatencyTracker()
+    totals = {'games': 0, 'moves': 0, 'overloaded': 0, 'fallbacks': 0, 'errors': 0}
+    request = dict(options, ai=ai, depth=depth)
+    start = time.perf_counter()
+    await asyncio.gather(*(simulated_player(host, port, games, request, random.Random(rng.randrange(2**32)),
+                                            move_latency, totals) for _ in range(clients)))
+    seconds = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection(host, port)
+    server_stats = await _request(reader, writer, {'op': "stats"})
+    writer.close()
+    return dict(totals, clients=clients, seconds=seconds, moves_per_s=totals['moves'] / seconds,
+                games_per_s=totals['games'] / seconds, latency=move_latency.summary(), server=server_stats)
+
+
+async def _load_local(server: GameServer, **load_options):
+    await server.start()
+    try:
+        return await run_load(server.host, server.port, **load_options)
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Mancala game server (JSON lines over TCP) and load generator")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="run the server")
+    load_parser = subparsers.add_parser("load", help="simulate concurrent players against a server")
+    for sub in (serve_parser, load_parser):
+        sub.add_argument("--host", default="127.0.0.1")
+        sub.add_argument("--port", type=int, default=8765)
+    for sub in (serve_parser, load_parser):
+        sub.add_argument("--workers", type=int, default=2, help="AI worker processes (load: with --local)")
+        sub.add_argument("--max-pending", type=int)
+        sub.add_argument("--max-queue", type=int)
+        sub.add_argument("--deadline-ms", type=int, default=5000)
+        sub.add_argument("--weights", help="HeuristicTuning weights file for weighted AIs")
+    load_parser.add_argument("--local", action="store_true", help="start a server in this process (on a free port)")
+    load_parser.add_argument("--clients", type=int, default=10)
+    load_parser.add_argument("--games", type=int, default=1, help="games per client")
+    load_parser.add_argument("--ai", choices=AI_TYPES, default="abpruning")
+    load_parser.add_argument("--depth", type=int, default=3)
+    load_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = GameServer(args.host, 0 if args.command == "load" else args.port, args.workers, args.max_pending,
+                        args.max_queue, args.deadline_ms, weights=args.weights)
+    if args.command == "serve":
+        async def serve():
+            await server.start()
+            print(f"Serving on {server.host}:{server.port} with {server.workers} AI workers")
+            await server.serve_forever()
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+    else:
+        load_options = dict(clients=args.clients, games=args.games, ai=args.ai, depth=args.depth, seed=args.seed)
+        if args.local:
+            report = asyncio.run(_load_local(server, **load_options))
+        else:
+            report = asyncio.run(run_load(args.host, args.port, **load_options))
+        latency = report['latency']
+        print(f"{report['games']} games, {report['moves']} moves by {report['clients']} clients in {report['seconds']:.2f}s: "
+              f"{report['moves_per_s']:.1f} moves/s, {report['games_per_s']:.2f} games/s")
+        print(f"move round trip: p50 {latency['p50_ms']:.1f} ms  p90 {latency['p90_ms']:.1f} ms  "
+              f"p99 {latency['p99_ms']:.1f} ms  max {latency['max_ms']:.1f} ms")
+        print(f"overloaded {report['overloaded']}, fallback moves {report['fallbacks']}, errors {report['errors']}")
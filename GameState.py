@@ -0,0 +1,133 @@
+from MancalaGame import Mancala, sowing_tables, sow
+
+class GameState:
+    """
+    Compact, immutable and hashable Mancala position for search nodes and memo/cache keys.
+
+    board: tuple with the same layout as Mancala.board
+    player: player to move (1 or 2)
+    The move log and the verbose flag of Mancala are not part of a state. The hash is computed once,
+    so hashing and equality are O(1) for repeated lookups.
+    """
+    __slots__ = ("board", "player", "_hash")
+
+    def __init__(self, board, player=1):
+        object.__setattr__(self, "board", tuple(board))
+        object.__setattr__(self, "player", player)
+        object.__setattr__(self, "_hash", hash((self.board, player)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GameState is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return isinstance(other, GameState) and self._hash == other._hash and self.player == other.player and self.board == other.board
+
+    def __repr__(self):
+        return f"GameState({self.board}, player={self.player})"
+
+    def __reduce__(self):
+        return (GameState, (self.board, self.player))
+
+    @classmethod
+    def from_mancala(cls, game: Mancala):
+        return cls(game.board, game.current_player)
+
+    def to_mancala(self, verbose=False):
+        """
+        New Mancala game in this position (with an empty move log)
+        """
+        game = Mancala(self.pits_per_player, 0, verbose)
+        game.board = list(self.board)
+        game.current_player = self.player
+        return game
+
+    # Same index attributes as Mancala, so heuristics written for Mancala also work on states
+    @property
+    def pits_per_player(self):
+        return len(self.board) // 2 - 1
+
+    @property
+    def current_player(self):
+        return self.player
+
+    @property
+    def p1_pits_index(self):
+        return [0, self.pits_per_player - 1]
+
+    @property
+    def p1_mancala_index(self):
+        return self.pits_per_player
+
+    @property
+    def p2_pits_index(self):
+        return [self.pits_per_player + 1, len(self.board) - 2]
+
+    @property
+    def p2_mancala_index(self):
+        return len(self.board) - 1
+
+    def side_totals(self):
+        """
+        Stones in each player's pits, [p1_total, p2_total], like Mancala.side_totals
+        """
+        P = self.pits_per_player
+        return [sum(self.board[0:P]), sum(self.board[P + 1:2 * P + 1])]
+
+
+def legal_moves(state: GameState):
+    """
+    Non-empty pits (1-indexed) of the player to move, same as Mancala.get_valid_moves
+    """
+    P = len(state.board) // 2 - 1
+    start = 0 if state.player == 1 else P + 1
+    board = state.board
+    return [i + 1 for i in range(P) if board[start + i] > 0]
+
+
+def is_terminal(state: GameState):
+    """
+    True if either side has no stones left in its pits (Mancala.winning_eval without the sweep)
+    """
+    P = len(state.board) // 2 - 1
+    board = state.board
+    return not any(board[0:P]) or not any(board[P + 1:2 * P + 1])
+
+
+def final_state(state: GameState):
+    """
+    Terminal position with the remaining stones swept into each player's mancala, like Mancala.winning_eval
+    """
+    P = len(state.board) // 2 - 1
+    board = state.board
+    p1_sum = sum(board[0:P])
+    p2_sum = sum(board[P + 1:2 * P + 1])
+    swept = (0,) * P + (board[P] + p1_sum,) + (0,) * P + (board[2 * P + 1] + p2_sum,)
+    return GameState(swept, state.player)
+
+
+def terminal_score(state: GameState):
+    """
+    Final (p1_score, p2_score) of a terminal state
+    """
+    board = final_state(state).board
+    P = len(board) // 2 - 1
+    return board[P], board[2 * P + 1]
+
+
+def successor(state: GameState, pit):
+    """
+    State after the player to move plays pit (must be a legal move), same rules and lookup tables as Mancala.play
+    """
+    board = list(state.board)
+    sow(board, state.player, pit, sowing_tables(len(board) // 2 - 1))
+    return GameState(board, 2 if state.player == 1 else 1)
+
+
+def successors(state: GameState):
+    """
+    List of (pit, next_state) for every legal move
+    """
+    return [(pit, successor(state, pit)) for pit in legal_moves(state)]
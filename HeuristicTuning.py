@@ -0,0 +1,260 @@
+import json
+import os
+import random
+from multiprocessing import Pool
+import numpy as np
+from MancalaGame import Mancala
+from ABPruningAI import ABPruningAI
+from ABModifiedHeuristicAI import ABModifiedHeuristicAI
+from WeightedHeuristicAI import FEATURES, ABMODIFIED_WEIGHTS
+from PlayGames import game_seed
+
+# Searches that can label positions (their heuristic is used at the leaves of the labelling search)
+LABEL_AIS = {
+    'abpruning': ABPruningAI,
+    'abmodified': ABModifiedHeuristicAI,
+}
+ARRAYS = ("boards", "players", "labels")
+META_FILE = "meta.json"
+
+def _label_game(task):
+    """
+    Plays one self-play game, labelling every position on the way with the search's value for player 1.
+    The search's best move is played, except for the first opening_plies moves and a share epsilon of the others,
+    which are random so the games don't all follow the same line
+    returns: list of (board, player to move, label)
+    """
+    seed, pits_per_player, stones_per_pit, depth, label_ai, endgame, opening_plies, epsilon, max_moves = task
+    rng = random.Random(seed)
+    game = Mancala(pits_per_player, stones_per_pit)
+    # Positions the endgame database covers are scored exactly by the search, the root's value included
+    # (every child of a covered position is covered too)
+    ai = LABEL_AIS[label_ai](game, 1, depth, endgame=endgame)
+    positions = []
+    move_count = 0
+    while not game.winning_eval() and move_count < max_moves:
+        value, move = ai.negamax(game, depth, float('-inf'), float('inf'))
+        positions.append((list(game.board), game.current_player, value if game.current_player == 1 else -value))
+        if move_count < opening_plies or rng.random() < epsilon:
+            move = game.random_move_generator(rng)
+        game.play(move)
+        move_count += 1
+    return positions
+
+
+def _write_meta(directory, meta):
+    tmp_path = os.path.join(directory, META_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp_path, os.path.join(directory, META_FILE))
+
+
+def generate(directory, positions=100000, depth=6, label_ai="abpruning", endgame=None, opening_plies=4, epsilon=0.1,
+             seed=None, workers=1, pits_per_player=6, stones_per_pit=4, max_moves=500, verbose=False):
+    """
+    Writes a training set of positions from self-play games to directory, as memory-mapped NumPy arrays:
+        boards.npy   (positions, board size) stones per board index, Mancala.board layout
+        players.npy  (positions,) player to move
+        labels.npy   (positions,) value for player 1 of a depth-deep label_ai search (final score difference expected),
+                     exact for positions the endgame database covers
+        meta.json    settings and the number of positions written so far
+    Games are labelled in blocks across workers processes and streamed into the arrays as they come in, so memory
+    use doesn't grow with positions. Game n is seeded with PlayGames.game_seed(seed, n): the same seed gives the
+    same data for any number of workers.
+    returns: the meta dict
+    """
+    if label_ai not in LABEL_AIS:
+        raise ValueError(f"label_ai must be one of {tuple(LABEL_AIS)}")
+    if endgame is not None and endgame.pits_per_player != pits_per_player:
+        raise ValueError(f"endgame database is for {endgame.pits_per_player} pits per player, "
+                         f"the games have {pits_per_player}")
+    os.makedirs(directory, exist_ok=True)
+    seed = seed if seed is not None else random.randrange(2**32)
+    board_size = (pits_per_player + 1) * 2
+    stone_dtype = np.uint8 if board_size * stones_per_pit < 256 else np.uint16
+    boards = np.lib.format.open_memmap(os.path.join(directory, "boards.npy"), mode="w+", dtype=stone_dtype,
+                                       shape=(positions, board_size))
+    players = np.lib.format.open_memmap(os.path.join(directory, "players.npy"), mode="w+", dtype=np.uint8,
+                                        shape=(positions,))
+    labels = np.lib.format.open_memmap(os.path.join(directory, "labels.npy"), mode="w+", dtype=np.float32,
+                                       shape=(positions,))
+    meta = {
+        'count': 0,
+        'games': 0,
+        'config': {
+            'depth': depth,
+            'label_ai': label_ai,
+            'endgame': endgame is not None,
+            'opening_plies': opening_plies,
+            'epsilon': epsilon,
+            'seed': seed,
+            'pits_per_player': pits_per_player,
+            'stones_per_pit': stones_per_pit,
+            'max_moves': max_moves,
+        },
+    }
+    _write_meta(directory, meta)
+
+    pool = Pool(workers) if workers > 1 else None
+    block_size = max(16, workers * 4)
+    count = 0
+    game_num = 0
+    try:
+        while count < positions:
+            tasks = [(game_seed(seed, game_num + i + 1), pits_per_player, stones_per_pit, depth, label_ai, endgame,
+                      opening_plies, epsilon, max_moves) for i in range(block_size)]
+            results = pool.imap(_label_game, tasks) if pool is not None else map(_label_game, tasks)
+            for game_positions in results:
+                game_num += 1
+                take = game_positions[:positions - count]
+                if take:
+                    boards[count:count + len(take)] = [board for board, _, _ in take]
+                    players[count:count + len(take)] = [player for _, player, _ in take]
+                    labels[count:count + len(take)] = [label for _, _, label in take]
+                    count += len(take)
+                if count >= positions:
+                    break
+            for array in (boards, players, labels):
+                array.flush()
+            meta['count'] = count
+            meta['games'] = game_num
+            _write_meta(directory, meta)
+            if verbose:
+                print(f"{count}/{positions} positions from {game_num} games")
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return meta
+
+
+def load_dataset(directory):
+    """
+    (boards, players, labels) of a generate() directory, memory-mapped read-only and cut to the positions written
+    """
+    with open(os.path.join(directory, META_FILE)) as f:
+        count = json.load(f)['count']
+    return tuple(np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")[:count] for name in ARRAYS)
+
+
+def feature_matrix(boards, players):
+    """
+    FEATURES of every position at once (same values as WeightedHeuristicAI.features, player 1's point of view)
+    returns: (positions, len(FEATURES)) float64 array
+    """
+    boards = np.asarray(boards, dtype=np.int32)
+    P = boards.shape[1] // 2 - 1
+    p1_pits = boards[:, 0:P]
+    p2_pits = boards[:, P + 1:2 * P + 1]
+    columns = {
+        'mancala_diff': boards[:, P] - boards[:, 2 * P + 1],
+        'pit_diff': p1_pits[:, :-1].sum(axis=1) - p2_pits[:, :-1].sum(axis=1),
+        'last_pit_diff': p1_pits[:, -1] - p2_pits[:, -1],
+        'empty_pit_diff': (p1_pits == 0).sum(axis=1) - (p2_pits == 0).sum(axis=1),
+        'to_move': np.where(np.asarray(players) == 1, 1, -1),
+    }
+    return np.stack([columns[name] for name in FEATURES], axis=1).astype(np.float64)
+
+
+def weight_vector(weights):
+    return np.array([weights.get(name, 0.0) for name in FEATURES], dtype=np.float64)
+
+
+def fit_weights(directory, ridge=1e-3, chunk_size=1 << 18, features=FEATURES):
+    """
+    Least-squares fit of the weights of features (a subset of FEATURES, the others weigh 0) to the labels.
+    The normal equations are summed chunk by chunk over the memory-mapped arrays, so only chunk_size positions
+    are in memory at a time. ridge: L2 penalty per position, keeps unused / collinear features at 0
+    returns: {feature: weight}
+    """
+    columns = [FEATURES.index(name) for name in features]
+    boards, players, labels = load_dataset(directory)
+    n = len(labels)
+    if n == 0:
+        raise ValueError(f"{directory} holds no positions")
+    xtx = np.zeros((len(columns), len(columns)))
+    xty = np.zeros(len(columns))
+    for start in range(0, n, chunk_size):
+        x = feature_matrix(boards[start:start + chunk_size], players[start:start + chunk_size])[:, columns]
+        y = np.asarray(labels[start:start + chunk_size], dtype=np.float64)
+        xtx += x.T @ x
+        xty += x.T @ y
+    solution = np.linalg.solve(xtx + ridge * n * np.eye(len(columns)), xty)
+    return {name: float(weight) for name, weight in zip(features, solution)}
+
+
+def evaluate(directory, weights, chunk_size=1 << 18):
+    """
+    How well the weighted heuristic predicts the labels, over every position in batches
+    returns: {'positions', 'rmse', 'mae', 'sign_agreement'}, sign_agreement being the share of positions with a
+             non-zero label where the heuristic picks the same side as ahead
+    """
+    w = weight_vector(weights)
+    boards, players, labels = load_dataset(directory)
+    n = len(labels)
+    squared = absolute = agree = decided = 0.0
+    for start in range(0, n, chunk_size):
+        prediction = feature_matrix(boards[start:start + chunk_size], players[start:start + chunk_size]) @ w
+        y = np.asarray(labels[start:start + chunk_size], dtype=np.float64)
+        error = prediction - y
+        squared += float(error @ error)
+        absolute += float(np.abs(error).sum())
+        nonzero = y != 0
+        agree += float((np.sign(prediction[nonzero]) == np.sign(y[nonzero])).sum())
+        decided += float(nonzero.sum())
+    return {
+        'positions': n,
+        'rmse': (squared / n) ** 0.5 if n else 0.0,
+        'mae': absolute / n if n else 0.0,
+        'sign_agreement': agree / decided if decided else 0.0,
+    }
+
+
+def save_weights(path, weights, info=None):
+    """
+    Saves weights for WeightedHeuristicAI(weights=path) / PlayGames(weights=path)
+    """
+    with open(path, "w") as f:
+        json.dump({'features': list(FEATURES), 'weights': weights, 'info': info or {}}, f, indent=1)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Tune WeightedHeuristicAI weights on self-play positions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    gen_parser = subparsers.add_parser("generate", help="label self-play positions into a dataset directory")
+    gen_parser.add_argument("directory")
+    gen_parser.add_argument("--positions", type=int, default=100000)
+    gen_parser.add_argument("--depth", type=int, default=6)
+    gen_parser.add_argument("--label-ai", choices=tuple(LABEL_AIS), default="abpruning")
+    gen_parser.add_argument("--endgame", help="EndgameDatabase file for exact labels near the end")
+    gen_parser.add_argument("--opening-plies", type=int, default=4)
+    gen_parser.add_argument("--epsilon", type=float, default=0.1)
+    gen_parser.add_argument("--seed", type=int)
+    gen_parser.add_argument("--workers", type=int, default=1)
+    fit_parser = subparsers.add_parser("fit", help="fit weights to a dataset directory")
+    fit_parser.add_argument("directory")
+    fit_parser.add_argument("--out", help="weights file (printed only if not set)")
+    fit_parser.add_argument("--features", nargs="+", choices=FEATURES, default=list(FEATURES))
+    fit_parser.add_argument("--ridge", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        endgame = None
+        if args.endgame:
+            from EndgameDatabase import EndgameDatabase
+            endgame = EndgameDatabase(args.endgame)
+        meta = generate(args.directory, args.positions, args.depth, args.label_ai, endgame, args.opening_plies,
+                        args.epsilon, args.seed, args.workers, verbose=True)
+        print(f"{meta['count']} positions from {meta['games']} games in {args.directory}")
+    else:
+        weights = fit_weights(args.directory, args.ridge, features=args.features)
+        fitted = evaluate(args.directory, weights)
+        baseline = evaluate(args.directory, ABMODIFIED_WEIGHTS)
+        for name, weight in weights.items():
+            print(f"{name:>16} {weight:+.4f}")
+        for label, result in (("fitted", fitted), ("abmodified", baseline)):
+            print(f"{label:>16} rmse {result['rmse']:.3f}  mae {result['mae']:.3f}  sign {result['sign_agreement']:.1%}"
+                  f"  ({result['positions']} positions)")
+        if args.out:
+            save_weights(args.out, weights, {'dataset': args.directory, 'fitted': fitted, 'abmodified': baseline})
@@ -0,0 +1,131 @@
+import math
+import random
+import time
+from MancalaGame import Mancala, sowing_tables, sow
+from GameState import GameState, legal_moves, successor, is_terminal, terminal_score
+
+class Node:
+    __slots__ = ("state", "parent", "move", "children", "untried", "visits", "wins")
+
+    def __init__(self, state: GameState, parent=None, move=None):
+        """
+        Search tree node. wins counts results for the player who made move (the player NOT to move in state),
+        1 per win and 0.5 per tie
+        """
+        self.state = state
+        self.parent = parent
+        self.move = move
+        self.children = []
+        self.untried = [] if is_terminal(state) else legal_moves(state)
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MCTSAI:
+    def __init__(self, game: Mancala, playing=1, playouts=1000, time_limit_ms=None, exploration=1.4, rng=None):
+        """
+        Monte Carlo Tree Search player (UCT selection, one expansion per playout, random rollouts, backpropagation).
+
+        playouts: playouts per move, ignored when time_limit_ms is set
+        time_limit_ms: search for this long instead of a fixed number of playouts
+        exploration: UCT exploration constant
+        rng: random.Random used for rollouts (global random module by default)
+        Keep one instance for the whole game: choose_move reuses the subtree of the position actually reached.
+        """
+        self.game = game
+        self.playing = playing
+        self.playouts = playouts
+        self.time_limit_ms = time_limit_ms
+        self.exploration = exploration
+        self.rng = rng if rng is not None else random
+        self.root = None
+        self.tables = sowing_tables(game.pits_per_player)
+        self.last_playouts = 0
+
+    def reuse_root(self, state: GameState):
+        """
+        Finds state among the root's children and grandchildren (our move, then the opponent's), or starts a new tree
+        """
+        if self.root is not None:
+            if self.root.state == state:
+                return self.root
+            for child in self.root.children:
+                if child.state == state:
+                    child.parent = None
+                    return child
+                for grandchild in child.children:
+                    if grandchild.state == state:
+                        grandchild.parent = None
+                        return grandchild
+        return Node(state)
+
+    def rollout(self, state: GameState):
+        """
+        Plays random moves from state until the game ends, straight on a list with sow
+        returns: final (p1_score, p2_score)
+        """
+        board = list(state.board)
+        player = state.player - 1
+        P = len(board) // 2 - 1
+        tables = self.tables
+        choice = self.rng.choice
+        totals = [sum(board[0:P]), sum(board[P + 1:2 * P + 1])]   # Stones in each side's pits
+        while totals[0] and totals[1]:
+            own_start = 0 if player == 0 else P + 1
+            pit = choice([pit for pit in range(1, P + 1) if board[own_start + pit - 1]])
+            own_change, opp_change = sow(board, player + 1, pit, tables)
+            totals[player] += own_change
+            totals[1 - player] += opp_change
+            player = 1 - player
+        return board[P] + totals[0], board[2 * P + 1] + totals[1]
+
+    def select_child(self, node: Node):
+        log_visits = math.log(node.visits)
+        c = self.exploration
+        return max(node.children, key=lambda child: child.wins / child.visits + c * math.sqrt(log_visits / child.visits))
+
+    def playout(self, root: Node):
+        """
+        One MCTS iteration: select down the tree, expand one node, roll out, backpropagate
+        """
+        node = root
+        while not node.untried and node.children:
+            node = self.select_child(node)
+        if node.untried:
+            move = node.untried.pop(self.rng.randrange(len(node.untried)))
+            child = Node(successor(node.state, move), node, move)
+            node.children.append(child)
+            node = child
+        if is_terminal(node.state):
+            p1_score, p2_score = terminal_score(node.state)
+        else:
+            p1_score, p2_score = self.rollout(node.state)
+        winner = 1 if p1_score > p2_score else 2 if p2_score > p1_score else 0
+        while node is not None:
+            node.visits += 1
+            mover = 2 if node.state.player == 1 else 1   # Player who moved into this node
+            if winner == mover:
+                node.wins += 1
+            elif winner == 0:
+                node.wins += 0.5
+            node = node.parent
+
+    def choose_move(self):
+        state = GameState.from_mancala(self.game)
+        if is_terminal(state):
+            return None
+        root = self.reuse_root(state)
+        self.root = root
+        playouts = 0
+        if self.time_limit_ms is not None:
+            end = time.perf_counter() + self.time_limit_ms / 1000
+            while playouts == 0 or time.perf_counter() < end:
+                self.playout(root)
+                playouts += 1
+        else:
+            playouts = max(1, self.playouts)
+            for _ in range(playouts):
+                self.playout(root)
+        self.last_playouts = playouts
+        # Most visited move
+        return max(root.children, key=lambda child: child.visits).move
@@ -1,4 +1,89 @@
 import random
+from functools import lru_cache
+
+class SowingTables:
+    def __init__(self, pits_per_player):
+        """
+        Precomputed move tables for one board size, indexed [player-1][pit-1][stones % lap_size]:
+
+        lap_size: number of board positions a stone can land on (everything except the opponent's mancala)
+        sow: board indices receiving one stone from the partial lap (the stones after the full laps)
+        landing: board index of the last stone
+        can_capture: True if a last stone landing there captures when the pit was empty.
+                     Landing on the own first pit always means the stone hopped the opponent's mancala, which never captures
+        lap: board indices receiving one stone per full lap, per player (pits_per_player of them on each side)
+        sow_own / sow_opp: how many of the sow indices are pits of the mover / of the opponent
+        opposite: opposite pit of every pit index (None for the mancalas)
+        """
+        P = pits_per_player
+        size = (P + 1) * 2
+        self.pits_per_player = P
+        self.lap_size = size - 1
+        self.opposite = tuple(2 * P - i if i != P and i != size - 1 else None for i in range(size))
+        self.lap = []
+        self.sow = []
+        self.landing = []
+        self.can_capture = []
+        self.sow_own = []
+        self.sow_opp = []
+        for player in (1, 2):
+            own_start = 0 if player == 1 else P + 1
+            # Sowing order, starting at the player's first pit and skipping the opponent's mancala
+            lap = [(own_start + i) % size for i in range(size)]
+            lap.remove(size - 1 if player == 1 else P)
+            self.lap.append(tuple(lap))
+            sow, landing, can_capture = [], [], []
+            opp_start = P + 1 if player == 1 else 0
+            for pit in range(P):
+                sow.append(tuple(tuple(lap[(pit + k) % self.lap_size] for k in range(1, r + 1)) for r in range(self.lap_size)))
+                ends = [lap[(pit + r) % self.lap_size] for r in range(self.lap_size)]
+                landing.append(tuple(ends))
+                can_capture.append(tuple(own_start < end < own_start + P for end in ends))
+            self.sow.append(sow)
+            self.landing.append(landing)
+            self.can_capture.append(can_capture)
+            self.sow_own.append([tuple(sum(own_start <= i < own_start + P for i in indices) for indices in pit_sow) for pit_sow in sow])
+            self.sow_opp.append([tuple(sum(opp_start <= i < opp_start + P for i in indices) for indices in pit_sow) for pit_sow in sow])
+
+@lru_cache(maxsize=None)
+def sowing_tables(pits_per_player):
+    """
+    Shared SowingTables for a board size, built once per pits_per_player
+    """
+    return SowingTables(pits_per_player)
+
+def sow(board, player, pit, tables):
+    """
+    Plays pit (1 to pits_per_player, a legal move) for player (1 or 2) in place on board, a list in the Mancala.board
+    layout: picks up the stones, sows them with the precomputed tables and captures. The one copy of the move rules,
+    shared by Mancala.play, GameState.successor and the MCTS rollouts.
+    returns: change in the number of stones in the mover's pits, and in the opponent's pits
+    """
+    P = tables.pits_per_player
+    p = player - 1
+    source = pit - 1 if p == 0 else P + pit
+    stones = board[source]
+    board[source] = 0
+    full_laps, partial = divmod(stones, tables.lap_size)
+    if full_laps:
+        for i in tables.lap[p]:
+            board[i] += full_laps
+    for i in tables.sow[p][pit - 1][partial]:
+        board[i] += 1
+    own_change = full_laps * P + tables.sow_own[p][pit - 1][partial] - stones
+    opp_change = full_laps * P + tables.sow_opp[p][pit - 1][partial]
+
+    # Last stone, special. Claim opposite pit and the stone if it lands in an empty pit on players side
+    last_index = tables.landing[p][pit - 1][partial]
+    if tables.can_capture[p][pit - 1][partial] and board[last_index] == 1:
+        opposite_index = tables.opposite[last_index]
+        captured = board[opposite_index]
+        board[P if p == 0 else 2 * P + 1] += 1 + captured
+        board[opposite_index] = 0
+        board[last_index] = 0
+        own_change -= 1
+        opp_change -= captured
+    return own_change, opp_change
 
 class Mancala:
     def __init__(self, pits_per_player=6, stones_per_pit = 4, verbose = False):
@@ -13,6 +98,7 @@ class Mancala:
         p1_pits_index: A list containing two elements representing the start and end indices of player 1's pits in the board data structure.
         p2_pits_index: Similar to p1_pits_index, it contains the start and end indices for player 2's pits on the board.
         p1_mancala_index and p2_mancala_index: These variables hold the indices of the Mancala pits on the board for players 1 and 2, respectively.
+        Stones in each player's pits are counted incrementally by play (see side_totals).
         """
         self.pits_per_player = pits_per_player
         self.board = [stones_per_pit] * ((pits_per_player+1) * 2)  # Initialize each pit with stones_per_pit number of stones 
@@ -24,10 +110,45 @@ class Mancala:
         self.p2_pits_index = [self.pits_per_player+1, len(self.board)-1-1]
         self.p2_mancala_index = len(self.board)-1
         self.verbose = verbose
+        self.tables = sowing_tables(pits_per_player)
         
         # Zeroing the Mancala for both players
         self.board[self.p1_mancala_index] = 0
         self.board[self.p2_mancala_index] = 0
+        self.count_sides()
+
+    def count_sides(self):
+        """
+        Recounts the stones in each player's pits from the board
+        """
+        P = self.pits_per_player
+        self._side_totals = [sum(self.board[0:P]), sum(self.board[P+1:2*P+1])]
+        self._totals_board = self.board
+
+    def side_totals(self):
+        """
+        Stones in each player's pits, [p1_total, p2_total], kept up to date by play instead of summed on every call.
+        A board assigned from outside (game.board = [...]) is recounted on the next call; changing single pits
+        of the board from outside needs a call to count_sides()
+        """
+        if self.board is not self._totals_board:
+            self.count_sides()
+        return self._side_totals
+
+    def is_terminal(self):
+        """
+        True if either player's pits are empty, the check of winning_eval without sweeping the board or printing
+        """
+        p1_total, p2_total = self.side_totals()
+        return p1_total == 0 or p2_total == 0
+
+    def final_scores(self):
+        """
+        (p1_score, p2_score) if the game ended now: each mancala plus the stones left in that player's pits,
+        which is what winning_eval sweeps into them. The board is not changed
+        """
+        p1_total, p2_total = self.side_totals()
+        return self.board[self.p1_mancala_index] + p1_total, self.board[self.p2_mancala_index] + p2_total
 
     def __str__(self):
         self.display_board()
@@ -85,13 +206,16 @@ class Mancala:
 
         return False
         
-    def random_move_generator(self):
+    def random_move_generator(self, rng=None):
         """
         Function to generate random valid moves with non-empty pits for the random player
+        rng: optional random.Random to draw from instead of the global random module
         """
         valid_pits = self.get_valid_moves()
         # Return random valid pit
-        return random.choice(valid_pits)
+        if rng is None:
+            return random.choice(valid_pits)
+        return rng.choice(valid_pits)
 
     def get_valid_moves(self):
         """
@@ -123,70 +247,57 @@ class Mancala:
             return self.board
 
         # Verify if the board is in a winning state
-        if self.winning_eval():
+        if self.is_terminal():
+            self.winning_eval()   # Sweeps the board, as before
             if self.verbose:
                 print("GAME OVER")
             return self.board
         
-        # Take turn
-        curr_index = pit-1 + self.p1_pits_index[0] if self.current_player == 1 else pit-1 + self.p2_pits_index[0]   # Track which pit we're looking at
-        cur_mancala_idx = self.p1_mancala_index if self.current_player == 1 else self.p2_mancala_index
-        opp_mancala_idx = self.p2_mancala_index if self.current_player == 1 else self.p1_mancala_index # Identify the index to skip (opponents mancala)
-        stones_in_hand = self.board[curr_index]                                 # /
-        self.board[curr_index] = 0                                              # | "Pick up" stones in the current pit, and shift pointer to the next pit
-        curr_index = curr_index + 1 if curr_index < len(self.board)-1 else 0    # \
-
-        # Distribute stones
-        while stones_in_hand > 1:
-            if curr_index != opp_mancala_idx:
-                self.board[curr_index] += 1
-                stones_in_hand -= 1
-            curr_index = curr_index + 1 if curr_index < len(self.board)-1 else 0    # Properly shift curr_index pointer
-        # Last stone, special. Claim opposite pit and the stone if it lands in an empty pit on players side
-        if curr_index == opp_mancala_idx:
-            curr_index = curr_index + 1 if curr_index < len(self.board)-1 else 0
-            self.board[curr_index] += 1
-        elif curr_index == cur_mancala_idx or self.board[curr_index] != 0:
-            self.board[curr_index] += 1
-        elif self.current_player == 1 and (curr_index > self.p1_pits_index[1] or curr_index < self.p1_pits_index[0]):
-            self.board[curr_index] += 1
-        elif self.current_player == 2 and (curr_index > self.p2_pits_index[1] or curr_index < self.p2_pits_index[0]):
-            self.board[curr_index] += 1
-        else:
-            # Capture opposite stones
-            p1_pits = [i for i in range(self.p1_pits_index[0], self.p1_pits_index[1]+1)]
-            p2_pits = [i for i in range(self.p2_pits_index[0], self.p2_pits_index[1]+1)]
-            p2_pits.reverse()
-            captured_stones = 0
-            # Find pit of opposite side of board, clear, and capture stones
-            if curr_index in p1_pits:
-                captured_stones = self.board[p2_pits[p1_pits.index(curr_index)]]
-                self.board[p2_pits[p1_pits.index(curr_index)]] = 0
-            else:
-                captured_stones = self.board[p1_pits[p2_pits.index(curr_index)]]
-                self.board[p1_pits[p2_pits.index(curr_index)]] = 0
-            # Add to current players mancala
-            self.board[cur_mancala_idx] += 1 + captured_stones
-        stones_in_hand -= 1
-
-
+        # Take turn: pick up the stones, then sow them with the precomputed tables (no per-stone walk around the board)
+        totals = self._side_totals   # In sync, is_terminal just checked
+        player = self.current_player - 1
+        own_change, opp_change = sow(self.board, self.current_player, pit, self.tables)
+        totals[player] += own_change
+        totals[1 - player] += opp_change
 
         # Log move, switch player, and return
         self.moves.append((self.current_player, pit))
         self.current_player = 1 if self.current_player == 2 else 2
-        return self.board                       
-    
+        return self.board
+
+    def snapshot(self):
+        """
+        Returns an undo record for the current state: a snapshot of the board, the player to move, the length of the move log
+        and the side totals. Passing it to unmake_move restores the game exactly, including any end-of-game sweep done later by winning_eval.
+        """
+        return (tuple(self.board), self.current_player, len(self.moves), tuple(self.side_totals()))
+
+    def make_move(self, pit):
+        """
+        Plays a move in place (same rules as play) and returns the undo record (see snapshot) of the position before it
+        """
+        undo = self.snapshot()
+        self.play(pit)
+        return undo
+
+    def unmake_move(self, undo):
+        """
+        Restores board, current_player, the move log and the side totals from a record returned by make_move
+        """
+        board, player, num_moves, totals = undo
+        self.board[:] = board
+        self._side_totals[:] = totals
+        self._totals_board = self.board
+        self.current_player = player
+        del self.moves[num_moves:]
+
     def winning_eval(self):
         """
         Function to verify if the game board has reached the winning state.
         Hint: If either of the players' pits are all empty, then it is considered a winning state.
         """
         # Make sure there's at least 1 stone in at least 1 of each players pits
-        end_game = False                                  
-        if sum(self.board[self.p1_pits_index[0]:self.p1_pits_index[1]+1]) == 0:  
-            end_game = True
-        if sum(self.board[self.p2_pits_index[0]:self.p2_pits_index[1]+1]) == 0:  
-            end_game = True
+        end_game = self.is_terminal()
 
         # If game is over, determine the winner and print the score
         if end_game:
@@ -201,6 +312,7 @@ class Mancala:
                 p2_sum += self.board[i]
                 self.board[i] = 0
             self.board[self.p2_mancala_index] += p2_sum
+            self._side_totals[:] = [0, 0]
             
             # Determine winner, print
             if self.verbose:
@@ -0,0 +1,378 @@
+import math
+import time
+from MancalaGame import Mancala
+from TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
+from SearchHelpers import SearchTimeout, Deadline, MoveOrdering, SearchStats
+from GameState import GameState, successors, is_terminal, terminal_score
+from EndgameDatabase import EndgameDatabase
+from OpeningBook import OpeningBook
+from ParallelSearch import ParallelSearch
+
+INF = float('inf')
+
+def mancala_difference(state, player):
+    """
+    Own mancala minus the opponent's (ABPruningAI, MinimaxAI)
+    """
+    if player == 1:
+        return state.board[state.p1_mancala_index] - state.board[state.p2_mancala_index]
+    return state.board[state.p2_mancala_index] - state.board[state.p1_mancala_index]
+
+
+def mancala_and_pits(state, player):
+    """
+    Mancala difference plus a quarter of the difference in stones in each side's pits (ABModifiedHeuristicAI).
+    The idea being that having more stones on your side of the board is better
+    """
+    board = state.board
+    p1_total, p2_total = state.side_totals()
+    # Pit sums over [pits_index[0], pits_index[1]) from the side totals, so each side's last pit stays left out
+    p1_pits = p1_total - board[state.p1_pits_index[1]]
+    p2_pits = p2_total - board[state.p2_pits_index[1]]
+    if player == 1:
+        mancala_diff = board[state.p1_mancala_index] - board[state.p2_mancala_index]
+        pit_diff = p1_pits - p2_pits
+    else:
+        mancala_diff = board[state.p2_mancala_index] - board[state.p1_mancala_index]
+        pit_diff = p2_pits - p1_pits
+    return mancala_diff + 0.25*pit_diff
+
+
+class NegamaxAI:
+    # Heuristic of the subclasses: evaluate(state, player) -> value of state for player. Must be zero-sum
+    # (evaluate(state, 1) == -evaluate(state, 2)), which negamax and the transposition table rely on
+    evaluate = staticmethod(mancala_difference)
+    # OpeningBook.build ai_type whose books the subclass can play (None: no book fits its search)
+    book_type = None
+
+    def __init__(self, game: Mancala, playing=1, depth=5, tt: TranspositionTable = None, time_limit_ms=None, use_state=False, endgame: EndgameDatabase = None, book: OpeningBook = None, parallel: ParallelSearch = None, stats: SearchStats = None, persistent=False, heuristic=None, pruning=True, pvs=True, aspiration=None):
+        """
+        Negamax search core of the minimax and alpha-beta AIs, which only pick its heuristic and settings.
+        Values are from the point of view of the player to move, so one branch serves both sides.
+
+        tt: optional TranspositionTable, shared between choose_move calls when the same table is passed in again
+        time_limit_ms: if set, choose_move does iterative deepening (depth 1, 2, 3... up to depth) with move ordering
+                       and returns the best move of the last iteration that finished inside the budget
+        use_state: fixed-depth search on immutable GameState nodes instead of the live game (no tt / time budget)
+        endgame: optional EndgameDatabase, positions it covers get their exact final score instead of being searched
+        book: optional OpeningBook, consulted before searching. Must have been built by this AI's type (book_type) to
+              at least depth, for the game's board
+        parallel: optional ParallelSearch, fixed-depth choose_move then runs across its process pool (no tt / time budget)
+        stats: optional SearchStats, filled in by the make/unmake searches (not by use_state or the parallel workers)
+        persistent: the AI is kept for the whole game, iterative deepening then keeps its move ordering (PV, killers,
+                    history) from one move to the next. Pair it with a tt that lives as long to reuse earlier searches
+        heuristic: evaluate(state, player) function, instead of the class's
+        pruning: alpha-beta pruning; without it every node is searched (plain minimax, use_state then memoizes)
+        pvs: principal variation search, moves after the first are searched with a null window around the best
+             score so far and only re-searched with the full window if they beat it
+        aspiration: iterative deepening searches each depth in a window of +-aspiration around the score of two
+                    depths before (same side moving last, odd and even depths swing apart), widened on a fail.
+                    None / 0 for full windows
+        Without an endgame database and with no tt or a fresh one, the value is the full-width search's, and among
+        equally good moves the first one searched is chosen, like the minimax / alpha-beta searches this core replaced.
+        Exact endgame scores, and deeper entries left in a tt reused across moves or games, can change both.
+        """
+        if tt is not None and tt.hasher.board_size != len(game.board):
+            raise ValueError(f"transposition table is for boards of {tt.hasher.board_size} pits and mancalas, "
+                             f"the game has {len(game.board)}")
+        if endgame is not None and endgame.pits_per_player != game.pits_per_player:
+            raise ValueError(f"endgame database is for {endgame.pits_per_player} pits per player, "
+                             f"the game has {game.pits_per_player}")
+        if book is not None:
+            book.check(self.book_type, depth, game)
+        if parallel is not None and (time_limit_ms is not None or tt is not None):
+            raise ValueError("parallel search is fixed-depth without a transposition table, "
+                             "it can't be combined with time_limit_ms or tt")
+        self.game = game
+        self.max_depth = depth
+        self.playing = playing
+        self.tt = tt
+        self.time_limit_ms = time_limit_ms
+        self.ordering = None
+        self.deadline = None
+        self.search_depth = depth
+        self.completed_depth = 0
+        self.use_state = use_state
+        self.endgame = endgame
+        self.book = book
+        self.parallel = parallel
+        self.stats = stats
+        self.persistent = persistent
+        self.pruning = pruning
+        self.pvs = pvs and pruning
+        self.aspiration = aspiration if pruning else None
+        self.memo = {}
+        self.moves_seen = len(game.moves)
+        self.total_stones = sum(game.board)
+        self.heuristic_args = {}
+        if heuristic is not None:
+            self.evaluate = heuristic
+            # Rebuilds this AI in the ParallelSearch / Ponderer worker processes
+            self.heuristic_args = {'heuristic': heuristic}
+
+    def heuristic(self, state: Mancala):
+        """
+        Heuristic value of state for self.playing
+        """
+        return self.evaluate(state, self.playing)
+
+    def final_value(self, state: Mancala, player=None):
+        """
+        Value of a finished game for player (self.playing by default): the final score difference, i.e. the heuristic
+        of the board after the end-of-game sweep
+        """
+        p1_score, p2_score = state.final_scores()
+        return p1_score - p2_score if (player or self.playing) == 1 else p2_score - p1_score
+
+    def negamax(self, state: Mancala, depth, alpha, beta, keys=None):
+        """
+        Fail-soft alpha-beta on the live game with make/unmake, values for the player to move in state:
+        a value inside (alpha, beta) is exact, one <= alpha an upper bound and one >= beta a lower bound
+        keys: Zobrist keys of state, only used with a transposition table
+        returns: value, best move
+        """
+        # Iterative deepening bookkeeping: time budget and a fresh PV for this ply
+        ordering = self.ordering
+        ply = self.search_depth - depth
+        if ordering is not None:
+            if self.deadline is not None:
+                self.deadline.check()
+            ordering.clear_pv(ply)
+        stats = self.stats
+        if stats is not None:
+            stats.nodes += 1
+            if ply > stats.max_depth:
+                stats.max_depth = ply
+
+        player = state.current_player
+        # Exact value from the endgame database (not at the root, which still has to pick a move)
+        if self.endgame is not None and ply > 0:
+            if self.endgame.covers(self.total_stones - state.board[state.p1_mancala_index] - state.board[state.p2_mancala_index]):
+                if stats is not None:
+                    stats.endgame_hits += 1
+                return self.endgame.final_score_diff(state, player), None
+
+        if depth == 0:
+            if stats is not None:
+                stats.leaves += 1
+            return self.evaluate(state, player), None
+        if state.is_terminal():
+            if stats is not None:
+                stats.terminal += 1
+            return self.final_value(state, player), None
+
+        valid_moves = state.get_valid_moves()
+
+        # Transposition table lookup, values are stored for the player to move
+        tt = self.tt
+        tt_move = None
+        if tt is not None:
+            if keys is None:
+                keys = tt.hasher.hash(state)
+            entry = tt.probe(keys, player)
+            if entry is not None:
+                tt_depth, tt_value, tt_bound, tt_move = entry
+                if tt_depth >= depth and (tt_bound == EXACT or (tt_bound == LOWER and tt_value >= beta)
+                                          or (tt_bound == UPPER and tt_value <= alpha)):
+                    if stats is not None:
+                        stats.tt_hits += 1
+                    return tt_value, tt_move
+            alpha_orig = alpha
+
+        # Move ordering: full ordering with iterative deepening, otherwise just the transposition table move first
+        if ordering is not None:
+            moves = ordering.order(valid_moves, ply, player, tt_move)
+        elif tt_move is not None and tt_move in valid_moves:
+            moves = [tt_move] + [move for move in valid_moves if move != tt_move]
+        else:
+            moves = valid_moves
+
+        pruning = self.pruning
+        # Null windows pay off with move ordering or a transposition table to catch the re-searches, not on plain
+        # get_valid_moves order, where the first move is often not the best
+        pvs = self.pvs and (ordering is not None or tt is not None)
+        best = -INF
+        top_move = None
+        for move in moves:
+            undo = state.make_move(move)
+            child_keys = tt.hasher.update(keys, undo[0], state.board) if tt is not None else None
+            if not pruning:
+                score = -self.negamax(state, depth - 1, -INF, INF, child_keys)[0]
+            elif top_move is None or not pvs:
+                score = -self.negamax(state, depth - 1, -beta, -alpha, child_keys)[0]
+            else:
+                # Null window: only tells whether the move beats alpha
+                score = -self.negamax(state, depth - 1, -math.nextafter(alpha, INF), -alpha, child_keys)[0]
+                if alpha < score < beta:
+                    if stats is not None:
+                        stats.researches += 1
+                    score = -self.negamax(state, depth - 1, -beta, -alpha, child_keys)[0]
+            state.unmake_move(undo)
+
+            if score > best:
+                best = score
+                top_move = move
+                if ordering is not None:
+                    ordering.update_pv(ply, move)
+            if pruning and score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    if ordering is not None:
+                        ordering.cutoff(move, ply, player, depth)
+                    if stats is not None:
+                        stats.cutoff(player == self.playing, move == moves[0])
+                    break
+
+        if tt is not None:
+            if best <= alpha_orig:
+                bound = UPPER
+            elif best >= beta:
+                bound = LOWER
+            else:
+                bound = EXACT
+            tt.store(keys, player, depth, best, bound, top_move)
+        return best, top_move
+
+    def negamax_state(self, state: GameState, depth, alpha, beta):
+        """
+        Same search as negamax on GameState nodes, without transposition table or move ordering. Without pruning
+        the value only depends on (state, depth), so it is memoized
+        returns: value for the player to move, best move
+        """
+        pruning = self.pruning
+        if not pruning and (state, depth) in self.memo:
+            return self.memo[state, depth]
+        player = state.player
+        # Depth first, as in negamax: a terminal position at the horizon gets the heuristic of the unswept board
+        if depth == 0:
+            result = self.evaluate(state, player), None
+        elif is_terminal(state):
+            p1_score, p2_score = terminal_score(state)
+            result = (p1_score - p2_score if player == 1 else p2_score - p1_score), None
+        else:
+            best = -INF
+            top_move = None
+            for move, next_state in successors(state):
+                if pruning:
+                    score = -self.negamax_state(next_state, depth - 1, -beta, -alpha)[0]
+                else:
+                    score = -self.negamax_state(next_state, depth - 1, -INF, INF)[0]
+                if score > best:
+                    best = score
+                    top_move = move
+                if pruning:
+                    alpha = max(alpha, score)
+                    if alpha >= beta:
+                        break
+            result = best, top_move
+        if not pruning:
+            self.memo[state, depth] = result
+        return result
+
+    def root_value(self, value):
+        """
+        Converts a negamax value of the root position to self.playing's point of view
+        """
+        return value if self.game.current_player == self.playing else -value
+
+    def aspiration_search(self, depth, guess):
+        """
+        Root search at depth in a window around guess (the value two depths before), widened until the value falls
+        inside it. returns: value, best move
+        """
+        if guess is None or not self.aspiration:
+            return self.negamax(self.game, depth, -INF, INF)
+        delta = self.aspiration
+        alpha, beta = guess - delta, guess + delta
+        while True:
+            value, move = self.negamax(self.game, depth, alpha, beta)
+            if alpha < value < beta or (alpha == -INF and beta == INF):
+                return value, move
+            if self.stats is not None:
+                self.stats.researches += 1
+            delta *= 4
+            if value <= alpha:
+                alpha = value - delta if delta < 16 * self.aspiration else -INF
+            else:
+                beta = value + delta if delta < 16 * self.aspiration else INF
+
+    def iterative_deepening(self):
+        """
+        Searches depth 1, 2, 3... until time_limit_ms runs out or max_depth is done.
+        Every iteration is ordered with the previous PV plus killer/history moves, in an aspiration window.
+        returns: best move of the last completed iteration
+        """
+        if self.persistent and self.ordering is not None:
+            self.ordering.advance(self.game.moves[self.moves_seen:])
+        else:
+            self.ordering = MoveOrdering(self.game.pits_per_player)
+        self.deadline = Deadline(self.time_limit_ms)
+        root = self.game.snapshot()
+        top_move = None
+        values = []
+        stats = self.stats
+        for depth in range(1, self.max_depth + 1):
+            self.search_depth = depth
+            self.ordering.new_iteration()
+            start = time.perf_counter()
+            try:
+                value, move = self.aspiration_search(depth, values[-2] if len(values) > 1 else None)
+            except SearchTimeout:
+                self.game.unmake_move(root)   # Unwound mid-search, put the game back as it was
+                break
+            if stats is not None and stats.timings:
+                stats.time_depth(depth, time.perf_counter() - start)
+            top_move = move
+            values.append(value)
+            self.completed_depth = depth
+            self.deadline.armed = True
+            if self.deadline.expired():
+                break
+        self.deadline = None
+        if stats is not None:
+            stats.end_move(self.completed_depth)
+        return top_move
+
+    def expected_reply(self):
+        """
+        Opponent's best reply in the current position according to the last search (its PV, or the transposition
+        table), after the move that search chose was played. None if the search didn't leave one
+        """
+        game = self.game
+        if not game.moves or is_terminal(GameState.from_mancala(game)):
+            return None
+        reply = None
+        pv = self.ordering.pv_table[0] if self.ordering is not None else []
+        if len(pv) > 1 and pv[0] == game.moves[-1][1]:
+            reply = pv[1]
+        elif self.tt is not None:
+            entry = self.tt.probe(self.tt.hasher.hash(game), game.current_player)
+            if entry is not None:
+                reply = entry[3]
+        return reply if reply is not None and game.valid_move(reply) else None
+
+    def choose_move(self):
+        if self.book is not None:
+            book_move = self.book.lookup(self.game)
+            if book_move is not None and self.game.valid_move(book_move):
+                return book_move
+        if self.parallel is not None:
+            return self.parallel.choose_move(self)
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.time_limit_ms is not None:
+            top_move = self.iterative_deepening()
+            self.moves_seen = len(self.game.moves)
+            return top_move
+        if self.use_state:
+            state = GameState.from_mancala(self.game)
+            return self.negamax_state(state, self.max_depth, -INF, INF)[1]
+
+        start = time.perf_counter()
+        self.search_depth = self.max_depth
+        _, top_move = self.negamax(self.game, self.max_depth, -INF, INF)
+        if self.stats is not None:
+            if self.stats.timings:
+                self.stats.time_depth(self.max_depth, time.perf_counter() - start)
+            self.stats.end_move(self.max_depth)
+        return top_move
@@ -0,0 +1,141 @@
+import os
+import struct
+from multiprocessing import Pool
+from MancalaGame import Mancala
+from GameState import GameState, successors, is_terminal
+
+MAGIC = b"MNCLBOOK"
+HEADER = struct.Struct("<8sIIII16sQ")    # magic, pits_per_player, stones_per_pit, plies, depth, ai type, number of entries
+
+class OpeningBook:
+    def __init__(self, path):
+        """
+        Opening book written by OpeningBook.build: position -> best move found by a deep offline search.
+
+        Entries are fixed-size records (one byte per pit, then player to move and move). The file is only read
+        on the first lookup, so an unused book costs nothing, and pickling an unloaded book into a worker is cheap.
+        """
+        self.path = path
+        self.entries = None
+        self.pits_per_player = None
+        self.stones_per_pit = None
+        self.plies = None
+        self.depth = None
+        self.ai_type = None
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def read_header(self, f=None):
+        """
+        Fills in the settings the book was built with (pits_per_player, stones_per_pit, plies, depth, ai_type)
+        returns: number of entries
+        """
+        if f is None:
+            with open(self.path, "rb") as f:
+                return self.read_header(f)
+        magic, self.pits_per_player, self.stones_per_pit, self.plies, self.depth, ai_type, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not an opening book")
+        self.ai_type = ai_type.rstrip(b"\0").decode()
+        return count
+
+    def check(self, ai_type, depth, game):
+        """
+        Raises ValueError unless the book was searched by ai_type (PlayGames player type) to at least depth,
+        for game's board and number of stones
+        """
+        if self.ai_type is None:
+            self.read_header()
+        if self.ai_type != ai_type:
+            raise ValueError(f"{self.path} was searched by {self.ai_type}, not {ai_type}")
+        if self.depth < depth:
+            raise ValueError(f"{self.path} was searched to depth {self.depth}, the AI searches to depth {depth}")
+        if self.pits_per_player != game.pits_per_player or 2 * self.pits_per_player * self.stones_per_pit != sum(game.board):
+            raise ValueError(f"{self.path} is for {self.pits_per_player} pits of {self.stones_per_pit} stones per player")
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            count = self.read_header(f)
+            board_size = (self.pits_per_player + 1) * 2
+            record = board_size + 2
+            data = f.read(record * count)
+        entries = {}
+        for i in range(count):
+            chunk = data[i*record:(i+1)*record]
+            entries[GameState(chunk[:board_size], chunk[board_size])] = chunk[board_size+1]
+        self.entries = entries
+
+    def lookup(self, game):
+        """
+        Book move for the player to move in game (Mancala or GameState), or None if the position is not in the book
+        """
+        if self.entries is None:
+            self.load()
+        if isinstance(game, GameState):
+            return self.entries.get(game)
+        return self.entries.get(GameState.from_mancala(game))
+
+    def __len__(self):
+        if self.entries is None:
+            self.load()
+        return len(self.entries)
+
+    @staticmethod
+    def build(path, ai_type="abpruning", plies=4, depth=10, pits_per_player=6, stones_per_pit=4, workers=1, verbose=False):
+        """
+        Searches every position reachable in fewer than plies moves from the start with ai_type (PlayGames player type)
+        at depth, for the player to move, and writes the best moves to path. workers > 1 searches positions in parallel.
+        """
+        start = GameState.from_mancala(Mancala(pits_per_player, stones_per_pit))
+        positions = []
+        layer = [start]
+        seen = {start}
+        for _ in range(plies):
+            positions.extend(layer)
+            next_layer = []
+            for state in layer:
+                for _, child in successors(state):
+                    if child not in seen and not is_terminal(child):
+                        seen.add(child)
+                        next_layer.append(child)
+            layer = next_layer
+        if max(max(state.board) for state in positions) > 255:
+            raise ValueError("pit counts don't fit in a byte")
+
+        jobs = [(state, ai_type, depth) for state in positions]
+        if workers > 1:
+            with Pool(workers) as pool:
+                moves = pool.map(_search_position, jobs, chunksize=1)
+        else:
+            moves = [_search_position(job) for job in jobs]
+        if verbose:
+            print(f"Searched {len(positions)} positions")
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, pits_per_player, stones_per_pit, plies, depth, ai_type.encode(), len(positions)))
+            for state, move in zip(positions, moves):
+                f.write(bytes(state.board) + bytes([state.player, move]))
+        os.replace(tmp_path, path)
+        return OpeningBook(path)
+
+
+def _search_position(job):
+    """
+    Best move for the player to move in state, searched by a fresh AI of the given type
+    """
+    from MinimaxAI import MinimaxAI
+    from ABPruningAI import ABPruningAI
+    from ABModifiedHeuristicAI import ABModifiedHeuristicAI
+    ai_classes = {
+        'minimax': MinimaxAI,
+        'abpruning': ABPruningAI,
+        'abmodified': ABModifiedHeuristicAI,
+    }
+    state, ai_type, depth = job
+    game = state.to_mancala()
+    return ai_classes[ai_type](game, state.player, depth).choose_move()
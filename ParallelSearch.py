@@ -0,0 +1,251 @@
+import time
+from multiprocessing import Pool, Value, Array
+from MancalaGame import Mancala
+from GameState import GameState, is_terminal, successor
+
+# Worker process state, set once per worker by _init_worker
+_shared_best = None
+_cutoffs = None
+
+def _init_worker(shared_best, cutoffs):
+    global _shared_best, _cutoffs
+    _shared_best = shared_best
+    _cutoffs = cutoffs
+
+
+def _search_task(task):
+    """
+    Searches one split point: the position after path from the root, with the root's best score so far as bound.
+    Scores are from the point of view of the player to move at the root (higher is better for the root). The bound is
+    re-read from shared memory when the task starts, so tasks that start later prune with the bounds other workers found.
+    returns: (task id, score or None if the root move was already refuted, bound used)
+    """
+    task_id, ai, root_state, path, root_index, bound = task
+    if _cutoffs[root_index]:
+        return task_id, None, bound
+    bound = max(bound, _shared_best.value)
+
+    game = root_state.to_mancala()
+    for move in path:
+        game.play(move)
+    remaining = ai.max_depth - len(path)
+    # Window that only resolves scores better than the bound for the root
+    if game.current_player == root_state.player:
+        score = ai.negamax(game, remaining, bound, float('inf'))[0]
+    else:
+        score = -ai.negamax(game, remaining, float('-inf'), -bound)[0]
+
+    if len(path) == 1 and score > bound:
+        with _shared_best.get_lock():
+            if score > _shared_best.value:
+                _shared_best.value = score
+    if len(path) == 2 and score <= bound:
+        _cutoffs[root_index] = 1   # One reply holds this root move to the bound, its other replies can be skipped
+    return task_id, score, bound
+
+
+class ParallelSearch:
+    def __init__(self, workers=2, split_ply=1):
+        """
+        Parallel fixed-depth alpha-beta for ABPruningAI / ABModifiedHeuristicAI (Young Brothers Wait at the root):
+        the first root move is searched serially to get a bound, then the other root moves are searched by a process pool
+        with that bound, which is shared between workers and tightened as better moves are found.
+
+        workers: pool size, the pool is created on first use and kept for later moves (call close() when done)
+        split_ply: 1 splits at the root, 2 also splits every younger root move into its replies
+                   (a reply that can't beat the bound refutes the root move and its remaining replies are skipped)
+        The chosen move is the same as the serial search at equal depth: candidates that could tie the best score
+        are re-searched with a full window so the first such move in 1..n order wins, as in the serial search.
+        Transposition tables, time budgets and move ordering are not used by the parallel part.
+        """
+        if split_ply not in (1, 2):
+            raise ValueError("split_ply must be 1 or 2")
+        self.workers = workers
+        self.split_ply = split_ply
+        self.pool = None
+        self.shared_best = None
+        self.cutoffs = None
+
+    def __getstate__(self):
+        raise TypeError("ParallelSearch can't be sent to other processes")
+
+    def _start(self, pits_per_player):
+        if self.pool is None or len(self.cutoffs) < pits_per_player:
+            self.close()
+            self.shared_best = Value('d', float('-inf'))
+            self.cutoffs = Array('b', pits_per_player)
+            self.pool = Pool(self.workers, initializer=_init_worker, initargs=(self.shared_best, self.cutoffs))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def choose_move(self, ai):
+        """
+        Best move for ai (an alpha-beta AI with its game, playing and max_depth set)
+        """
+        game = ai.game
+        valid_moves = game.get_valid_moves()
+        if game.is_terminal() or not valid_moves:
+            return None
+        self._start(game.pits_per_player)
+        ai.search_depth = ai.max_depth
+        root_state = GameState.from_mancala(game)
+
+        # Eldest brother, serially
+        undo = game.make_move(valid_moves[0])
+        best = -ai.negamax(game, ai.max_depth - 1, float('-inf'), float('inf'))[0]
+        game.unmake_move(undo)
+        if len(valid_moves) == 1:
+            return valid_moves[0]
+        self.shared_best.value = best
+        for i in range(len(self.cutoffs)):
+            self.cutoffs[i] = 0
+
+        # Younger brothers, in parallel. Tasks carry a copy of the AI without its game/tables
+        worker_ai = ai.__class__(Mancala(game.pits_per_player, 0), ai.playing, ai.max_depth, endgame=ai.endgame,
+                                 **getattr(ai, 'heuristic_args', {}))
+        worker_ai.total_stones = ai.total_stones
+        tasks = []
+        for index, move in enumerate(valid_moves[1:], 1):
+            child = root_state.to_mancala()
+            child.play(move)
+            split = self.split_ply == 2 and ai.max_depth > 1 and not is_terminal(GameState.from_mancala(child))
+            if split and ai.endgame is not None:
+                # A position the endgame database covers is not searched by the serial search either
+                stones = ai.total_stones - child.board[child.p1_mancala_index] - child.board[child.p2_mancala_index]
+                split = not ai.endgame.covers(stones)
+            if split:
+                for reply in child.get_valid_moves():
+                    tasks.append((len(tasks), worker_ai, root_state, (move, reply), index, best))
+            else:
+                tasks.append((len(tasks), worker_ai, root_state, (move,), index, best))
+
+        # Merge. A root move's score is the minimum over its parts (one part unless it was split into replies),
+        # and it is exact only if every part beat the bound it was searched with
+        num_parts = {}
+        for task in tasks:
+            num_parts[task[4]] = num_parts.get(task[4], 0) + 1
+        parts = {index: [] for index in num_parts}
+        exact = {}
+        upper = {}
+        for task_id, score, used in self.pool.imap_unordered(_search_task, tasks):
+            index = tasks[task_id][4]
+            parts[index].append((score, used))
+            if len(parts[index]) < num_parts[index]:
+                continue
+            scores = [score for score, _ in parts[index] if score is not None]
+            if len(scores) == num_parts[index] and all(score > used for score, used in parts[index]):
+                exact[index] = min(scores)
+                if exact[index] > self.shared_best.value:
+                    with self.shared_best.get_lock():
+                        self.shared_best.value = max(self.shared_best.value, exact[index])
+            else:
+                upper[index] = min(scores)
+
+        best_score = max([best] + list(exact.values()))
+        winner = 0 if best == best_score else min(i for i, s in exact.items() if s == best_score)
+        # Moves before the winner that were cut off at exactly the best score might tie it, check them in order
+        for index in sorted(upper):
+            if index < winner and upper[index] >= best_score:
+                undo = game.make_move(valid_moves[index])
+                value = -ai.negamax(game, ai.max_depth - 1, float('-inf'), float('inf'))[0]
+                game.unmake_move(undo)
+                if value == best_score:
+                    winner = index
+                    break
+        return valid_moves[winner]
+
+
+def _ponder_task(task):
+    """
+    Move a fresh copy of the AI would choose in state
+    """
+    state, ai_class, playing, depth, time_limit_ms, endgame, heuristic_args = task
+    return ai_class(state.to_mancala(), playing, depth, time_limit_ms=time_limit_ms, endgame=endgame,
+                    **heuristic_args).choose_move()
+
+
+class Ponderer:
+    def __init__(self):
+        """
+        Thinks on the opponent's time for one alpha-beta player: after the player moves, the position after the
+        opponent's expected reply (ai.expected_reply) is searched in a background process. If the opponent then plays
+        that reply, the player's move is already known (a ponder hit); otherwise the result is dropped.
+        The background search uses a copy of the AI with the same depth, time budget, endgame database and heuristic
+        settings (heuristic_args, e.g. WeightedHeuristicAI's weights) but without its transposition table or opening
+        book. Call close() when done.
+        """
+        self.pool = None
+        self.pending = None
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        raise TypeError("Ponderer can't be sent to other processes")
+
+    def start(self, ai):
+        """
+        Starts pondering for ai, whose move has just been played on ai.game
+        """
+        self.pending = None
+        reply = ai.expected_reply()
+        if reply is None:
+            return
+        predicted = successor(GameState.from_mancala(ai.game), reply)
+        if is_terminal(predicted) or (ai.book is not None and ai.book.lookup(predicted) is not None):
+            return
+        if self.pool is None:
+            self.pool = Pool(1)
+        task = (predicted, ai.__class__, ai.playing, ai.max_depth, ai.time_limit_ms, ai.endgame,
+                getattr(ai, 'heuristic_args', {}))
+        self.pending = (predicted, self.pool.apply_async(_ponder_task, (task,)))
+
+    def take(self, game):
+        """
+        Pondered move if game is in the predicted position (waiting for the search to finish), None otherwise
+        """
+        if self.pending is None:
+            return None
+        predicted, result = self.pending
+        self.pending = None
+        if GameState.from_mancala(game) != predicted:
+            self.misses += 1
+            return None   # A running search can't be stopped, it just finishes unused
+        self.hits += 1
+        return result.get()
+
+    def cancel(self):
+        """
+        Drops the pending search (e.g. at the end of a game)
+        """
+        self.pending = None
+
+    def close(self):
+        self.pending = None
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+
+def speedup_report(ai_class, game: Mancala, playing=1, depth=10, worker_counts=(1, 2, 4), split_ply=1):
+    """
+    Times one choose_move call serially and with each worker count.
+    returns: {workers: (seconds, speedup vs serial, move)}, workers 0 is the serial search
+    """
+    start = time.perf_counter()
+    serial_move = ai_class(game, playing, depth).choose_move()
+    serial_time = time.perf_counter() - start
+    report = {0: (serial_time, 1.0, serial_move)}
+    for workers in worker_counts:
+        search = ParallelSearch(workers, split_ply)
+        search._start(game.pits_per_player)   # Pool start-up is not part of the move time
+        start = time.perf_counter()
+        move = ai_class(game, playing, depth, parallel=search).choose_move()
+        elapsed = time.perf_counter() - start
+        search.close()
+        report[workers] = (elapsed, serial_time / elapsed, move)
+    return report
@@ -1,26 +1,127 @@
+import contextlib
+import hashlib
+import random
+from multiprocessing import Pool
 from MancalaGame import Mancala
 from MinimaxAI import MinimaxAI
 from ABPruningAI import ABPruningAI
 from ABModifiedHeuristicAI import ABModifiedHeuristicAI
+from WeightedHeuristicAI import WeightedHeuristicAI, load_weights
+from MCTSAI import MCTSAI
+from TranspositionTable import TranspositionTable
+from SearchHelpers import SearchStats
+from ParallelSearch import ParallelSearch, Ponderer
+from GameResults import ResultWriter, read_manifest
+from GameArchive import GameArchiveWriter
 from tqdm import tqdm
 
+def game_seed(master_seed, game_num):
+    """
+    Reproducible per-game seed derived from the batch's master seed
+    """
+    digest = hashlib.sha256(f"{master_seed}:{game_num}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+# Transposition table size of reuse_search players without tt_size
+REUSE_TT_SIZE = 1 << 18
+AI_TYPES = ("minimax", "abpruning", "abmodified", "weighted", "mcts")
+# Alpha-beta player types
+AB_TYPES = ("abpruning", "abmodified", "weighted")
+
+# Worker process state for parallel batches, set once per worker by _init_worker
+_worker_games = None
+
+def _init_worker(play_games):
+    global _worker_games
+    _worker_games = play_games
+
+def _play_game_worker(args):
+    game_num, max_moves, record_moves = args
+    stats = _worker_games.new_game_stats()
+    moves = [] if record_moves else None
+    return _worker_games.play_game(game_num, max_moves, stats, moves), stats, moves
+
 class PlayGames:
-    def __init__(self, p1type, p2type, numberGames=100, depth=5, verbose=False):
+    def __init__(self, p1type, p2type, numberGames=100, depth=5, verbose=False, tt_size=None, time_limit_ms=None, seed=None, workers=1, vectorized=False, endgame=None, book=None, search_workers=None, playouts=1000, search_stats=False, reuse_search=False, ponder=False, p1_depth=None, p2_depth=None, opening_plies=0, weights=None):
         """
             Player Types:
                 random
                 minimax
                 abpruning
                 abmodified
+                weighted (alpha-beta with a WeightedHeuristicAI heuristic, see weights; the abpruning/abmodified options below apply to it too)
+                mcts
+            tt_size: if set, abpruning/abmodified players each keep a TranspositionTable of this many entries for the whole batch
+            time_limit_ms: if set, abpruning/abmodified players use iterative deepening with this budget per move (depth becomes the max depth)
+                           and mcts players search for this long instead of a fixed number of playouts
+            seed: master seed, every game gets its own random.Random seeded with game_seed(seed, game_num). Random if None
+            workers: number of processes to spread the games over
+            endgame: optional EndgameDatabase for abpruning/abmodified players (shared with worker processes through the memory map)
+            book: optional OpeningBook for the players of the type it was built by, loaded on its first lookup, or a
+                  {player type: OpeningBook} dict of books for several types
+            search_workers: if set, abpruning/abmodified players split each fixed-depth search over this many processes
+                            (ParallelSearch); can't be combined with workers > 1, time_limit_ms, tt_size or reuse_search
+            playouts: playouts per move for mcts players
+            search_stats: collect SearchStats (nodes, cutoffs, branching factor, time per depth...) for the minimax/abpruning/abmodified
+                          players of every game; play_games adds them per game and summed over the batch
+            reuse_search: abpruning/abmodified players carry their search over from move to move: each keeps a transposition
+                          table for the whole game (or the batch table with tt_size) and, with time_limit_ms, its move ordering
+            ponder: with reuse_search, abpruning/abmodified players search their reply to the expected opponent move in a
+                    background process during the opponent's turn (ParallelSearch.Ponderer); can't be combined with workers > 1
+            p1_depth / p2_depth: search depth of one player, when the players should search to different depths (default depth)
+            opening_plies: the first opening_plies moves of every game are random (from the game's seed) whatever the player types,
+                           so deterministic AIs meet in different positions
+            weights: feature weights of weighted players, a {feature: weight} dict or a HeuristicTuning weights file
+                     (ABModifiedHeuristicAI's weights by default)
+            vectorized: random vs random only, play all games in lock step with the NumPy BatchMancala engine
+                        (same rules, but random moves come from NumPy so results differ from the scalar run for a given seed)
+        The same seed gives the same results for any number of workers, as long as the players are deterministic
+        (no time_limit_ms, and no tt_size since the tables then depend on which games a worker played before)
         """
         self.p1type = p1type
         self.p2type = p2type
         self.numberGames = numberGames
         self.depth = depth
+        self.p1_depth = p1_depth if p1_depth is not None else depth
+        self.p2_depth = p2_depth if p2_depth is not None else depth
+        self.opening_plies = opening_plies
+        self.weights = load_weights(weights) if isinstance(weights, str) else weights
         self.verbose = verbose
+        self.tt_size = tt_size
+        self.time_limit_ms = time_limit_ms
+        self.p1_tt = TranspositionTable(tt_size) if tt_size else None
+        self.p2_tt = TranspositionTable(tt_size) if tt_size else None
+        self.seed_given = seed is not None
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.workers = workers
+        self.vectorized = vectorized
+        self.playouts = playouts
+        self.search_stats = search_stats
+        pits_per_player = Mancala().pits_per_player
+        if endgame is not None and endgame.pits_per_player != pits_per_player:
+            raise ValueError(f"endgame database is for {endgame.pits_per_player} pits per player, "
+                             f"the games have {pits_per_player}")
+        self.endgame = endgame
+        if book is not None and not isinstance(book, dict):
+            book.read_header()
+            book = {book.ai_type: book}
+        self.books = book or {}
+        if search_workers and workers > 1:
+            raise ValueError("search_workers can't be combined with workers > 1")
+        if search_workers and (time_limit_ms is not None or tt_size or reuse_search):
+            raise ValueError("search_workers can't be combined with time_limit_ms, tt_size or reuse_search")
+        self.search = ParallelSearch(search_workers) if search_workers else None
+        self.reuse_search = reuse_search
+        if ponder and not reuse_search:
+            raise ValueError("ponder needs reuse_search")
+        if ponder and workers > 1:
+            raise ValueError("ponder can't be combined with workers > 1")
+        self.ponderers = {player: Ponderer() for player, ptype in ((1, p1type), (2, p2type))
+                          if ptype in AB_TYPES} if ponder else {}
         print(f"Playing {self.numberGames} games of {self.p1type} vs {self.p2type} with depth {self.depth}...")
 
-    def play_games(self, max_moves=500):
+    def play_games(self, max_moves=500, output=None, output_format="csv", resume=False, checkpoint_every=100, archive=None,
+                   overwrite=False):
         '''
         results['status'] tracks win/loss status
                 1: player 1 win
@@ -28,69 +129,252 @@ class PlayGames:
                 0: tie
         results['score] tracks tuples (p1_score, p2_score)
         results['num_moves] tracks #moves for each game
+        with search_stats, results['search_stats'] tracks {player: SearchStats.summary()} for each game
+        and results['search_summary'] has the same summaries over the whole batch
+
+        output: if set, each game's result is appended to this file as it finishes (GameResults.ResultWriter, "csv" or
+                "binary" output_format) instead of being kept in memory, and a summary
+                {'output', 'games', 'status_counts'} is returned; read the file back with GameResults.read_results
+        resume: continue an interrupted output file from its last checkpoint, with the same master seed, so the
+                games played are the ones the uninterrupted run would have played (a larger numberGames extends it)
+        checkpoint_every: games between flushes of the output file and its manifest
+        archive: if set, the seed and moves of every game are also appended to this GameArchive file (with run_config,
+                 so any game can be replayed or re-simulated later); a resumed output resumes the archive with it
+        overwrite: replace existing output / archive files that are not resumed, instead of raising FileExistsError
+        '''
+        if archive is not None and self.vectorized:
+            raise ValueError("vectorized runs can't be archived")
+        if output is None:
+            if self.vectorized:
+                return self.play_games_vectorized(max_moves)
+            results = {
+                'status': [],
+                'score': [],
+                'num_moves': []
+            }
+            totals = self.new_game_stats()
+            if totals is not None:
+                results['search_stats'] = []
+            with self.open_archive(archive, max_moves, checkpoint_every, overwrite=overwrite) as archive_writer:
+                for game_num, game_result, game_stats, moves in self.iter_games(1, max_moves, archive is not None):
+                    if archive_writer is not None:
+                        archive_writer.write(game_seed(self.seed, game_num), moves)
+                    self.add_result(results, game_num, game_result, game_stats)
+                    if totals is not None:
+                        self.merge_stats(totals, game_stats)
+            if totals is not None:
+                results['search_summary'] = {player: stats.summary() for player, stats in totals.items()}
+            # Return results after all games finish
+            return results
+
+        if resume and not self.seed_given:
+            manifest = read_manifest(output)
+            if manifest is not None:
+                self.seed = manifest['config']['seed']
+        totals = self.new_game_stats()
+        with ResultWriter(output, output_format, self.run_config(max_moves), resume, checkpoint_every, overwrite) as writer, \
+                self.open_archive(archive, max_moves, checkpoint_every, resume, writer.games_done, overwrite) as archive_writer:
+            if self.vectorized:
+                if writer.games_done:
+                    raise ValueError("vectorized runs can't be resumed")
+                results = self.play_games_vectorized(max_moves)
+                for game_result in zip(results['status'], results['score'], results['num_moves']):
+                    writer.write(*game_result)
+            else:
+                for game_num, game_result, game_stats, moves in self.iter_games(writer.games_done + 1, max_moves, archive is not None):
+                    if self.verbose and game_num % 10 == 0:
+                        print(f"Played Game {game_num}/{self.numberGames}")
+                    # Archived first, and both files checkpoint every checkpoint_every games: the archive's checkpoint
+                    # for a game is on disk before the results file's, so a resume never finds the archive behind
+                    if archive_writer is not None:
+                        archive_writer.write(game_seed(self.seed, game_num), moves)
+                    writer.write(*game_result)
+                    if totals is not None:
+                        self.merge_stats(totals, game_stats)
+        summary = writer.summary()
+        if totals is not None:
+            # Only the games played by this call, per-game stats are not kept in streaming mode
+            summary['search_summary'] = {player: stats.summary() for player, stats in totals.items()}
+        return summary
+
+    def open_archive(self, archive, max_moves, checkpoint_every=100, resume=False, games_done=0, overwrite=False):
+        """
+        GameArchiveWriter for play_games' archive option (a no-op context without one), checkpointed in step with
+        the results file. A resumed archive is cut back to the games_done games of the resumed results
+        """
+        if archive is None:
+            return contextlib.nullcontext()
+        archive_writer = GameArchiveWriter(archive, config=self.run_config(max_moves), resume=resume,
+                                           checkpoint_every=checkpoint_every, overwrite=overwrite)
+        if resume:
+            archive_writer.truncate(games_done)
+        return archive_writer
+
+    def run_config(self, max_moves):
+        """
+        Settings that decide which games a run plays, stored with streamed results so a resume can check them
+        """
+        return {
+            'p1type': self.p1type,
+            'p2type': self.p2type,
+            'depth': self.depth,
+            'p1_depth': self.p1_depth,
+            'p2_depth': self.p2_depth,
+            'opening_plies': self.opening_plies,
+            'weights': self.weights,
+            'seed': self.seed,
+            'max_moves': max_moves,
+            'tt_size': self.tt_size,
+            'time_limit_ms': self.time_limit_ms,
+            'playouts': self.playouts,
+            'vectorized': self.vectorized,
+        }
+
+    def iter_games(self, first_game, max_moves=500, record_moves=False):
+        """
+        Plays games first_game..numberGames and yields (game_num, (status, score, num_moves), stats, moves) in game order,
+        stats being the game's {player: SearchStats} (None without search_stats) and moves its pits played
+        (None without record_moves).
+        Parallel runs hand games to the pool in blocks, so memory doesn't grow with numberGames
+        """
+        progress = tqdm(total=self.numberGames, initial=first_game - 1, desc="Games played")
+        try:
+            if self.workers > 1:
+                block = max(1000, self.workers * 64)
+                chunksize = max(1, min(self.numberGames, block) // (self.workers * 16))
+                with Pool(self.workers, initializer=_init_worker, initargs=(self,)) as pool:
+                    for block_start in range(first_game, self.numberGames + 1, block):
+                        game_nums = range(block_start, min(block_start + block, self.numberGames + 1))
+                        # imap keeps game order, so results line up with the serial run
+                        game_args = [(game_num, max_moves, record_moves) for game_num in game_nums]
+                        for game_num, (game_result, game_stats, moves) in zip(game_nums, pool.imap(_play_game_worker, game_args, chunksize)):
+                            progress.update()
+                            yield game_num, game_result, game_stats, moves
+            else:
+                for game_num in range(first_game, self.numberGames + 1):
+                    game_stats = self.new_game_stats()
+                    moves = [] if record_moves else None
+                    game_result = self.play_game(game_num, max_moves, game_stats, moves)
+                    progress.update()
+                    yield game_num, game_result, game_stats, moves
+        finally:
+            progress.close()
+            if self.search is not None:
+                self.search.close()
+            for ponderer in self.ponderers.values():
+                ponderer.close()
+
+    def play_games_vectorized(self, max_moves=500):
         '''
-        results = {
-            'status': [],
-            'score': [],
-            'num_moves': []
+        Random vs random batch on the NumPy engine, returns the same results structure as play_games
+        '''
+        if self.p1type != "random" or self.p2type != "random":
+            raise ValueError("vectorized mode only supports random vs random")
+        from BatchMancala import play_random_games   # NumPy is only needed for this mode
+
+        batch = play_random_games(self.numberGames, self.seed, max_moves)
+        status, p1_scores, p2_scores, num_moves = batch.results()
+        return {
+            'status': status.tolist(),
+            'score': list(zip(p1_scores.tolist(), p2_scores.tolist())),
+            'num_moves': num_moves.tolist()
         }
 
-        for game_num in tqdm(range(1, self.numberGames+1), desc="Games played"):
-            if self.verbose:
-                if game_num % 10 == 0:
-                    print(f"Playing Game {game_num}/{self.numberGames}...")
-
-            game = Mancala()
-            # Play until game is over (default 500 move max to prevent infinite loops)
-            move_count = 0
-            while not game.winning_eval() and move_count < max_moves:
-                # Determine next move depening on p1/p2 type
-                move = None
-                if game.current_player == 1:
-                    if self.p1type == "random":
-                        move = game.random_move_generator()
-                    elif self.p1type == "minimax":
-                        ai = MinimaxAI(game, 1, self.depth)
-                        move = ai.choose_move()
-                    elif self.p1type == "abpruning":
-                        ai = ABPruningAI(game, 1, self.depth)
-                        move = ai.choose_move()
-                    elif self.p1type == "abmodified":
-                        ai = ABModifiedHeuristicAI(game, 1, self.depth)
-                        move = ai.choose_move()
-                    else:
-                        print("Invalid p1type, using random move")
-                        move = game.random_move_generator()
-                else:
-                    if self.p2type == "random":
-                        move = game.random_move_generator()
-                    elif self.p2type == "minimax":
-                        ai = MinimaxAI(game, 2, self.depth)
-                        move = ai.choose_move()
-                    elif self.p2type == "abpruning":
-                        ai = ABPruningAI(game, 2, self.depth)
-                        move = ai.choose_move()
-                    elif self.p2type == "abmodified":
-                        ai = ABModifiedHeuristicAI(game, 2, self.depth)
-                        move = ai.choose_move()
-                    else:
-                        print("Invalid p2type, using random move")
-                        move = game.random_move_generator()
-                # Play the move
-                game.play(move)
-                move_count += 1
-                
-            # Add game to results
-            p1_score = game.board[game.p1_mancala_index]
-            p2_score = game.board[game.p2_mancala_index]
-            if p1_score > p2_score:
-                results['status'].append(1)
-            elif p1_score < p2_score:
-                results['status'].append(2)
+    def new_game_stats(self):
+        """
+        Fresh {player: SearchStats} for the searching players, or None without search_stats
+        """
+        if not self.search_stats:
+            return None
+        searching = ("minimax",) + AB_TYPES
+        return {player: SearchStats(timings=True) for player, ptype in ((1, self.p1type), (2, self.p2type)) if ptype in searching}
+
+    def merge_stats(self, totals, game_stats):
+        for player, stats in game_stats.items():
+            totals[player].merge(stats)
+
+    def add_result(self, results, game_num, game_result, game_stats=None):
+        """
+        Appends one game's (status, score, num_moves), and its search stats if collected, to results
+        """
+        if self.verbose:
+            if game_num % 10 == 0:
+                print(f"Played Game {game_num}/{self.numberGames}")
+        status, score, num_moves = game_result
+        results['status'].append(status)
+        results['score'].append(score)
+        results['num_moves'].append(num_moves)
+        if game_stats is not None:
+            results['search_stats'].append({player: stats.summary() for player, stats in game_stats.items()})
+
+    def new_ai(self, ptype, game, player, rng, stats=None):
+        """
+        AI of type ptype for player in game, random choices (mcts) come from rng
+        """
+        depth = self.p1_depth if player == 1 else self.p2_depth
+        if ptype == "minimax":
+            return MinimaxAI(game, player, depth, book=self.books.get(ptype), stats=stats)
+        if ptype == "mcts":
+            return MCTSAI(game, player, self.playouts, self.time_limit_ms, rng=rng)
+        tt = self.p1_tt if player == 1 else self.p2_tt
+        if self.reuse_search and tt is None:
+            tt = TranspositionTable(REUSE_TT_SIZE)
+        if ptype == "weighted":
+            return WeightedHeuristicAI(game, player, depth, tt, self.time_limit_ms, endgame=self.endgame, book=self.books.get(ptype),
+                                       parallel=self.search, stats=stats, persistent=self.reuse_search, weights=self.weights)
+        ai_class = ABPruningAI if ptype == "abpruning" else ABModifiedHeuristicAI
+        return ai_class(game, player, depth, tt, self.time_limit_ms, endgame=self.endgame, book=self.books.get(ptype),
+                        parallel=self.search, stats=stats, persistent=self.reuse_search)
+
+    def play_game(self, game_num, max_moves=500, stats=None, moves=None):
+        '''
+        Plays a single game, random moves come from the game's own seeded generator
+        stats: optional {player: SearchStats} (see new_game_stats) filled in by that player's searches
+        moves: optional list, filled in with the pits played in order
+        returns: (status, (p1_score, p2_score), num_moves)
+        '''
+        rng = random.Random(game_seed(self.seed, game_num))
+        stats = stats or {}
+        game = Mancala()
+        # AI players are created on their first move and live for the whole game
+        players = {}
+        # Play until game is over (default 500 move max to prevent infinite loops)
+        move_count = 0
+        while not game.winning_eval() and move_count < max_moves:
+            # Determine next move depening on p1/p2 type
+            player = game.current_player
+            ptype = self.p1type if player == 1 else self.p2type
+            move = None
+            if ptype == "random" or move_count < self.opening_plies:
+                move = game.random_move_generator(rng)
+            elif ptype in AI_TYPES:
+                if player not in players:
+                    players[player] = self.new_ai(ptype, game, player, rng, stats.get(player))
+                if player in self.ponderers:
+                    move = self.ponderers[player].take(game)
+                if move is None:
+                    move = players[player].choose_move()
             else:
-                results['status'].append(0)
-            results['score'].append((p1_score, p2_score))
-            results['num_moves'].append(move_count)
-        
-        # Return results after all games finish
-        return results
\ No newline at end of file
+                print(f"Invalid p{player}type, using random move")
+                move = game.random_move_generator(rng)
+            # Play the move
+            game.play(move)
+            move_count += 1
+            # Players still in the random opening have no AI to ponder with yet
+            if player in self.ponderers and player in players:
+                self.ponderers[player].start(players[player])
+        for ponderer in self.ponderers.values():
+            ponderer.cancel()
+        if moves is not None:
+            moves.extend(pit for _, pit in game.moves)
+
+        # Game result
+        p1_score = game.board[game.p1_mancala_index]
+        p2_score = game.board[game.p2_mancala_index]
+        if p1_score > p2_score:
+            status = 1
+        elif p1_score < p2_score:
+            status = 2
+        else:
+            status = 0
+        return status, (p1_score, p2_score), move_count
\ No newline at end of file
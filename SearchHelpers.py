@@ -0,0 +1,219 @@
+import math
+import time
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when the time budget of choose_move runs out
+    """
+    pass
+
+
+class Deadline:
+    def __init__(self, time_limit_ms, check_every=256):
+        """
+        Cheap time budget check for the recursive searches, the clock is only read every check_every calls
+        """
+        self.end = time.perf_counter() + time_limit_ms / 1000
+        self.check_every = check_every
+        self.calls = 0
+        self.armed = False   # Off until the first iteration completes, so there is always a move to return
+
+    def check(self):
+        self.calls += 1
+        if self.armed and self.calls % self.check_every == 0 and time.perf_counter() > self.end:
+            raise SearchTimeout()
+
+    def expired(self):
+        return time.perf_counter() > self.end
+
+
+class MoveOrdering:
+    def __init__(self, pits_per_player=6, max_ply=128):
+        """
+        Move ordering state for iterative deepening:
+            pv: principal variation of the last completed iteration, tried first while the search is still on it
+            killers: two moves per ply that caused a cutoff in a sibling subtree
+            history: cutoff counts per (player, pit), weighted by depth^2
+        """
+        self.max_ply = max_ply
+        self.killers = [[None, None] for _ in range(max_ply)]
+        self.history = {1: [0] * (pits_per_player + 1), 2: [0] * (pits_per_player + 1)}
+        self.pv = []
+        self.pv_table = [[] for _ in range(max_ply + 1)]
+        self.follow_pv = False
+
+    def new_iteration(self):
+        """
+        Called before each iteration: start following the previous PV and age the history scores
+        """
+        self.pv = list(self.pv_table[0])
+        self.follow_pv = bool(self.pv)
+        for player in self.history:
+            self.history[player] = [h // 2 for h in self.history[player]]
+
+    def advance(self, moves):
+        """
+        Carries the ordering over to a later search of the same game, after moves ((player, pit) pairs) were played:
+        the rest of the PV is kept if the game followed it, killers move up by len(moves) plies, history stays
+        """
+        n = len(moves)
+        pv = self.pv_table[0]
+        self.pv_table = [[] for _ in range(self.max_ply + 1)]
+        if pv[:n] == [pit for _, pit in moves]:
+            self.pv_table[0] = pv[n:]
+        self.killers = self.killers[n:] + [[None, None] for _ in range(min(n, self.max_ply))]
+
+    def order(self, moves, ply, player, tt_move=None):
+        """
+        Returns moves sorted by: transposition table move, PV move, killers, history score.
+        sorted is stable, so ties keep the 1..n order of get_valid_moves
+        """
+        pv_move = None
+        if self.follow_pv:
+            if ply < len(self.pv) and self.pv[ply] in moves:
+                pv_move = self.pv[ply]
+            else:
+                self.follow_pv = False
+        killers = self.killers[ply] if ply < self.max_ply else (None, None)
+        history = self.history[player]
+
+        def score(move):
+            if move == tt_move:
+                return 1 << 42
+            if move == pv_move:
+                return 1 << 41
+            if move == killers[0]:
+                return 1 << 40
+            if move == killers[1]:
+                return 1 << 39
+            return history[move]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def clear_pv(self, ply):
+        if ply < self.max_ply:
+            self.pv_table[ply] = []
+
+    def update_pv(self, ply, move):
+        """
+        New best move at ply: the PV from here is that move followed by the child's PV
+        """
+        if ply < self.max_ply:
+            self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+
+    def cutoff(self, move, ply, player, depth):
+        """
+        Records a move that caused an alpha/beta cutoff
+        """
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[player][move] += depth * depth
+
+
+class SearchStats:
+    def __init__(self, timings=False):
+        """
+        Opt-in search counters, passed to an AI as stats=. They add up over choose_move calls (and over games
+        when the same object is reused); an AI without stats only pays one None check per node.
+            nodes: calls of the recursive search, leaves included
+            leaves: nodes scored by the heuristic at the depth limit
+            terminal: nodes where the game was over before the depth limit
+            tt_hits / endgame_hits: nodes answered by the transposition table / endgame database
+            beta_cutoffs / alpha_cutoffs: cutoffs at maximizing / minimizing nodes
+            first_move_cutoffs: cutoffs caused by the first move searched (a measure of move ordering)
+            researches: null-window (PVS) and aspiration-window searches that failed and were repeated with a wider window
+            max_depth: deepest ply reached
+            moves: searched choose_move calls (book moves don't count)
+        timings: also record the time spent per search depth (iterative deepening iterations, or the one fixed depth)
+        """
+        self.timings = timings
+        self.nodes = 0
+        self.leaves = 0
+        self.terminal = 0
+        self.tt_hits = 0
+        self.endgame_hits = 0
+        self.beta_cutoffs = 0
+        self.alpha_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.researches = 0
+        self.max_depth = 0
+        self.moves = 0
+        self.log_branching = 0.0    # Sum over moves of log(nodes) / depth
+        self.depth_times = {}       # depth -> (seconds, searches)
+        self.move_start_nodes = 0
+
+    def cutoff(self, maximizing, first_move):
+        if maximizing:
+            self.beta_cutoffs += 1
+        else:
+            self.alpha_cutoffs += 1
+        if first_move:
+            self.first_move_cutoffs += 1
+
+    def time_depth(self, depth, seconds):
+        total, searches = self.depth_times.get(depth, (0.0, 0))
+        self.depth_times[depth] = (total + seconds, searches + 1)
+
+    def end_move(self, depth):
+        """
+        Called at the end of every searched choose_move with the depth it completed
+        """
+        nodes = self.nodes - self.move_start_nodes
+        self.move_start_nodes = self.nodes
+        self.moves += 1
+        if depth > 0 and nodes > 0:
+            self.log_branching += math.log(nodes) / depth
+
+    def merge(self, other):
+        """
+        Adds other's counts to these
+        """
+        for name in ("nodes", "leaves", "terminal", "tt_hits", "endgame_hits", "beta_cutoffs", "alpha_cutoffs",
+                     "first_move_cutoffs", "researches", "moves", "log_branching"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        for depth, (seconds, searches) in other.depth_times.items():
+            total, count = self.depth_times.get(depth, (0.0, 0))
+            self.depth_times[depth] = (total + seconds, count + searches)
+        self.move_start_nodes = self.nodes
+
+    @property
+    def cutoffs(self):
+        return self.beta_cutoffs + self.alpha_cutoffs
+
+    @property
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def effective_branching_factor(self):
+        """
+        Geometric mean over moves of nodes^(1/depth)
+        """
+        return math.exp(self.log_branching / self.moves) if self.moves else 0.0
+
+    def summary(self):
+        """
+        Counters and derived rates as a flat dict (e.g. one DataFrame row per game)
+        """
+        summary = {
+            'moves': self.moves,
+            'nodes': self.nodes,
+            'nodes_per_move': self.nodes / self.moves if self.moves else 0.0,
+            'leaves': self.leaves,
+            'terminal': self.terminal,
+            'tt_hits': self.tt_hits,
+            'endgame_hits': self.endgame_hits,
+            'beta_cutoffs': self.beta_cutoffs,
+            'alpha_cutoffs': self.alpha_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate,
+            'researches': self.researches,
+            'effective_branching_factor': self.effective_branching_factor,
+            'max_depth': self.max_depth,
+        }
+        for depth, (seconds, searches) in sorted(self.depth_times.items()):
+            summary[f'ms_depth_{depth}'] = seconds / searches * 1000
+        return summary
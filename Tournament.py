@@ -0,0 +1,274 @@
+import contextlib
+import io
+import math
+import random
+from multiprocessing import Pool
+from PlayGames import PlayGames
+
+DETERMINISTIC_TYPES = ("minimax", "abpruning", "abmodified", "weighted")
+
+def expected_score(elo_diff):
+    """
+    Logistic Elo model: expected score of a player elo_diff points stronger
+    """
+    return 1 / (1 + 10 ** (-elo_diff / 400))
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+class Agent:
+    def __init__(self, ptype, depth=5, name=None):
+        """
+        One tournament entrant: a PlayGames player type at a search depth (the heuristic comes with the type:
+        abpruning = mancala difference, abmodified = mancala + pit difference, weighted = the weights option)
+        """
+        self.ptype = ptype
+        self.depth = depth
+        self.name = name or (ptype if ptype in ("random", "mcts") else f"{ptype}-d{depth}")
+
+    def __repr__(self):
+        return f"Agent({self.name})"
+
+
+class Pairing:
+    def __init__(self, a: Agent, b: Agent):
+        """
+        Running result of a against b: wins, draws and losses from a's point of view. Everything below is
+        derived from these three counts, so the estimate and the test are updated in O(1) per game.
+        """
+        self.a = a
+        self.b = b
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.pairs = 0
+        self.decision = None
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def record(self, a_result):
+        """
+        a_result: 1 win, 0.5 draw, 0 loss for a
+        """
+        if a_result == 1:
+            self.wins += 1
+        elif a_result == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    def score_stats(self):
+        """
+        Mean and per-game variance of a's score, with one win and one loss of prior so that a short perfect
+        record isn't treated as certain
+        """
+        wins, draws, losses = self.wins + 1, self.draws, self.losses + 1
+        n = wins + draws + losses
+        score = (wins + 0.5 * draws) / n
+        variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+        return score, variance, n
+
+    def elo(self, z=1.96):
+        """
+        Elo difference a - b and its confidence interval (normal approximation, z=1.96 for 95%)
+        returns: (elo, low, high)
+        """
+        score, variance, n = self.score_stats()
+        margin = z * math.sqrt(variance / n)
+        return elo_from_score(score), elo_from_score(score - margin), elo_from_score(score + margin)
+
+    def llr(self, elo0, elo1):
+        """
+        Log-likelihood ratio of H1: elo = elo1 against H0: elo = elo0 (generalized SPRT, normal approximation of the
+        trinomial score distribution)
+        """
+        score, variance, n = self.score_stats()
+        s0 = expected_score(elo0)
+        s1 = expected_score(elo1)
+        return n * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+    def summary(self):
+        elo, low, high = self.elo()
+        return {
+            'a': self.a.name,
+            'b': self.b.name,
+            'wins': self.wins,
+            'draws': self.draws,
+            'losses': self.losses,
+            'games': self.games,
+            'elo': elo,
+            'elo_low': low,
+            'elo_high': high,
+            'decision': self.decision,
+        }
+
+
+def _play_pair(task):
+    """
+    One game pair on the same seed with sides swapped
+    returns: (pairing index, a's result as player 1, a's result as player 2)
+    """
+    index, a_first, b_first, game_num, max_moves = task
+    status1 = a_first.play_game(game_num, max_moves)[0]
+    status2 = b_first.play_game(game_num, max_moves)[0]
+    return index, {1: 1, 2: 0, 0: 0.5}[status1], {2: 1, 1: 0, 0: 0.5}[status2]
+
+
+class Tournament:
+    def __init__(self, agents, sprt_elo=50, alpha=0.05, beta=0.05, max_pairs=200, opening_plies=4, seed=None, workers=1, verbose=False, **options):
+        """
+        Round-robin between agents (Agent objects, or (ptype, depth) tuples) with sequential stopping per pairing.
+
+        Every pairing plays game pairs: the same seed (same random opening) once with each agent as player 1.
+        After each round a pairing is stopped once the SPRT of elo = +sprt_elo against elo = -sprt_elo (error rates
+        alpha / beta) decides which agent is stronger, or after max_pairs pairs. Rounds only schedule the pairings
+        still running, so clear matchups cost a few games and close ones get the rest.
+        opening_plies: random moves at the start of every game (PlayGames opening_plies). With 0, a pairing of two
+                       deterministic agents (minimax/alpha-beta without time_limit_ms) is decided by its first pair,
+                       as every further game would repeat it
+        workers: game pairs of a round are spread over this many processes
+        options: PlayGames settings for every game (time_limit_ms, playouts, tt_size, endgame, book, ...), a book is
+                 only played by the agents of the type it was built by
+        """
+        self.agents = [agent if isinstance(agent, Agent) else Agent(*agent) for agent in agents]
+        names = [agent.name for agent in self.agents]
+        if len(set(names)) != len(names):
+            raise ValueError(f"agent names must be unique: {names}")
+        self.sprt_elo = sprt_elo
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.max_pairs = max_pairs
+        self.opening_plies = opening_plies
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.workers = workers
+        self.verbose = verbose
+        self.options = options
+        self.pairings = [Pairing(a, b) for i, a in enumerate(self.agents) for b in self.agents[i+1:]]
+        self.runners = [(self.runner(p.a, p.b), self.runner(p.b, p.a)) for p in self.pairings]
+
+    def runner(self, p1: Agent, p2: Agent):
+        with contextlib.redirect_stdout(io.StringIO()):   # PlayGames announces every batch, there is one per pairing side
+            return PlayGames(p1.ptype, p2.ptype, self.max_pairs, p1_depth=p1.depth, p2_depth=p2.depth, seed=self.seed,
+                             opening_plies=self.opening_plies, **self.options)
+
+    def repeats(self, pairing: Pairing):
+        """
+        True if every game pair of pairing is the same game pair
+        """
+        return (self.opening_plies == 0 and self.options.get('time_limit_ms') is None
+                and pairing.a.ptype in DETERMINISTIC_TYPES and pairing.b.ptype in DETERMINISTIC_TYPES)
+
+    def settle(self, pairing: Pairing):
+        """
+        Decides pairing if the SPRT or the game cap allows it, returns True once it is decided
+        """
+        if pairing.decision is not None:
+            return True
+        llr = pairing.llr(-self.sprt_elo, self.sprt_elo)
+        if llr >= self.upper:
+            pairing.decision = pairing.a.name
+        elif llr <= self.lower:
+            pairing.decision = pairing.b.name
+        elif pairing.pairs > 0 and self.repeats(pairing):
+            # Every further pair would replay the first one
+            if pairing.wins != pairing.losses:
+                pairing.decision = pairing.a.name if pairing.wins > pairing.losses else pairing.b.name
+            else:
+                pairing.decision = "even"
+        elif pairing.pairs >= self.max_pairs:
+            pairing.decision = "inconclusive"
+        return pairing.decision is not None
+
+    def run(self, max_moves=500, pairs_per_round=1):
+        """
+        Plays rounds until every pairing is decided
+        returns: {'pairings': [Pairing.summary(), ...], 'ratings': {name: elo}, 'games': total games}
+        """
+        pool = Pool(self.workers) if self.workers > 1 else None
+        try:
+            while True:
+                tasks = []
+                for index, pairing in enumerate(self.pairings):
+                    if self.settle(pairing):
+                        continue
+                    for _ in range(min(pairs_per_round, self.max_pairs - pairing.pairs)):
+                        pairing.pairs += 1
+                        a_first, b_first = self.runners[index]
+                        tasks.append((index, a_first, b_first, pairing.pairs, max_moves))
+                if not tasks:
+                    break
+                results = pool.imap_unordered(_play_pair, tasks) if pool is not None else map(_play_pair, tasks)
+                for index, first, second in results:
+                    self.pairings[index].record(first)
+                    self.pairings[index].record(second)
+                if self.verbose:
+                    running = sum(1 for pairing in self.pairings if pairing.decision is None)
+                    print(f"Round done: {len(tasks)} game pairs, {running} pairings still running")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return {
+            'pairings': [pairing.summary() for pairing in self.pairings],
+            'ratings': self.ratings(),
+            'games': sum(pairing.games for pairing in self.pairings),
+        }
+
+    def ratings(self, iterations=200):
+        """
+        Elo rating of every agent fitted to all pairing results at once (Bradley-Terry maximum likelihood, draws as
+        half a win each, the same one win / one loss prior per pairing), shifted to average 0
+        """
+        names = [agent.name for agent in self.agents]
+        strength = {name: 1.0 for name in names}
+        scores = {name: 0.0 for name in names}
+        games = []
+        for pairing in self.pairings:
+            if pairing.games == 0:
+                continue
+            a, b = pairing.a.name, pairing.b.name
+            n = pairing.games + 2
+            a_score = pairing.wins + 0.5 * pairing.draws + 1
+            scores[a] += a_score
+            scores[b] += n - a_score
+            games.append((a, b, n))
+        for _ in range(iterations):
+            # Minorization-maximization update of the Bradley-Terry strengths
+            denominators = {name: 0.0 for name in names}
+            for a, b, n in games:
+                denominators[a] += n / (strength[a] + strength[b])
+                denominators[b] += n / (strength[a] + strength[b])
+            strength = {name: scores[name] / denominators[name] if denominators[name] else strength[name] for name in names}
+        elo = {name: 400 * math.log10(strength[name]) for name in names}
+        mean = sum(elo.values()) / len(elo)
+        return {name: value - mean for name, value in elo.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Round-robin Mancala tournament with SPRT early stopping")
+    parser.add_argument("agents", nargs="+", help="agents as type or type:depth, e.g. random abpruning:5 abmodified:5")
+    parser.add_argument("--sprt-elo", type=float, default=50)
+    parser.add_argument("--max-pairs", type=int, default=200)
+    parser.add_argument("--opening-plies", type=int, default=4)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--weights", help="HeuristicTuning weights file for weighted agents")
+    args = parser.parse_args()
+    agents = []
+    for spec in args.agents:
+        ptype, _, depth = spec.partition(":")
+        agents.append(Agent(ptype, int(depth) if depth else 5))
+    result = Tournament(agents, args.sprt_elo, max_pairs=args.max_pairs, opening_plies=args.opening_plies,
+                        seed=args.seed, workers=args.workers, verbose=True, weights=args.weights).run()
+    for summary in result['pairings']:
+        print(f"{summary['a']:>16} vs {summary['b']:<16} +{summary['wins']} ={summary['draws']} -{summary['losses']}"
+              f"  elo {summary['elo']:+.0f} [{summary['elo_low']:+.0f}, {summary['elo_high']:+.0f}]  -> {summary['decision']}")
+    for name, elo in sorted(result['ratings'].items(), key=lambda item: -item[1]):
+        print(f"{name:>16} {elo:+.0f}")
+    print(f"{result['games']} games")
@@ -0,0 +1,165 @@
+import random
+
+# Bound types stored with each entry
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class ZobristHasher:
+    def __init__(self, board_size=14, seed=2024):
+        """
+        Zobrist keys for a Mancala board of board_size pits (including both mancalas).
+
+        Every position is hashed from the point of view of the player to move: the mover's pits and mancala
+        come first, then the opponent's. A position and its mirror (sides swapped, other player to move) therefore
+        get the same key, and the side to move is folded into the key by that choice of frame.
+        To keep updates incremental both frames are tracked, as a pair (p1_frame_key, p2_frame_key).
+        """
+        self.board_size = board_size
+        self.half = board_size // 2
+        self.rng = random.Random(seed)
+        self.keys = [[] for _ in range(board_size)]   # keys[i][stones] -> 64-bit random number
+        self.max_stones = -1
+
+    def _extend(self, max_stones):
+        """
+        Grows the key table so that every pit can hold up to max_stones stones
+        """
+        for pit_keys in self.keys:
+            while len(pit_keys) <= max_stones:
+                pit_keys.append(self.rng.getrandbits(64))
+        self.max_stones = max_stones
+
+    def hash(self, game):
+        """
+        Full hash of a game, returns (p1_frame_key, p2_frame_key)
+        """
+        board = game.board
+        total = sum(board)
+        if total > self.max_stones:
+            self._extend(total)
+        h1 = 0
+        h2 = 0
+        for i, stones in enumerate(board):
+            h1 ^= self.keys[i][stones]
+            h2 ^= self.keys[(i + self.half) % self.board_size][stones]
+        return h1, h2
+
+    def update(self, keys, old_board, new_board):
+        """
+        Incremental hash update: only the pits that changed between old_board and new_board are XORed in/out
+        """
+        h1, h2 = keys
+        for i in range(self.board_size):
+            old = old_board[i]
+            new = new_board[i]
+            if old != new:
+                j = (i + self.half) % self.board_size
+                h1 ^= self.keys[i][old] ^ self.keys[i][new]
+                h2 ^= self.keys[j][old] ^ self.keys[j][new]
+        return h1, h2
+
+    @staticmethod
+    def key(keys, player):
+        """
+        Picks the key in the frame of the player to move
+        """
+        return keys[0] if player == 1 else keys[1]
+
+
+class TranspositionTable:
+    def __init__(self, size=1 << 20, replacement="depth", board_size=14):
+        """
+        Bounded transposition table for the alpha-beta searchers.
+
+        size: number of slots, each slot holds one entry (key, depth, value, bound, best_move, generation)
+        replacement: "depth" keeps the deeper entry unless the stored one is from an older search,
+                     "always" overwrites on every store
+        board_size: len(game.board) of the games searched with it (14 for 6 pits a side), checked by the searches
+        Values are stored from the point of view of the player to move, which is what lets mirror positions share
+        an entry. This assumes a zero-sum heuristic (heuristic for one side == -heuristic for the other).
+
+        Counters:
+            hits: probe found the same position
+            misses: probe found an empty slot
+            collisions: probe found a different position in the slot
+            stores / overwrites: entries written / entries of another position evicted
+        """
+        if replacement not in ("depth", "always"):
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        self.size = size
+        self.replacement = replacement
+        self.hasher = ZobristHasher(board_size)
+        self.table = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """
+        Marks the start of a new choose_move call so entries from older searches can be replaced first
+        """
+        self.generation += 1
+
+    def probe(self, keys, player, flip=False):
+        """
+        Looks up a position.
+        returns: (depth, value, bound, best_move) or None
+        flip: the caller scores positions for the player NOT to move, value and bound are converted accordingly
+        """
+        key = ZobristHasher.key(keys, player)
+        entry = self.table[key % self.size]
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        _, depth, value, bound, best_move, _ = entry
+        if flip:
+            value = -value
+            if bound != EXACT:
+                bound = UPPER if bound == LOWER else LOWER
+        return depth, value, bound, best_move
+
+    def store(self, keys, player, depth, value, bound, best_move, flip=False):
+        """
+        Stores a search result, see probe for flip
+        """
+        if flip:
+            value = -value
+            if bound != EXACT:
+                bound = UPPER if bound == LOWER else LOWER
+        key = ZobristHasher.key(keys, player)
+        slot = key % self.size
+        entry = self.table[slot]
+        if entry is not None and self.replacement == "depth":
+            if entry[0] == key or entry[5] == self.generation:
+                if entry[1] > depth:
+                    return
+        if entry is not None and entry[0] != key:
+            self.overwrites += 1
+        self.table[slot] = (key, depth, value, bound, best_move, self.generation)
+        self.stores += 1
+
+    def clear(self):
+        self.table = [None] * self.size
+        self.generation = 0
+
+    def stats(self):
+        """
+        Returns the counters plus the fill rate of the table
+        """
+        used = sum(1 for entry in self.table if entry is not None)
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'fill': used / self.size,
+        }
@@ -0,0 +1,80 @@
+import json
+from MancalaGame import Mancala
+from NegamaxAI import NegamaxAI
+
+# Board features, each the difference player 1 - player 2, so a weighted sum is zero-sum like the other heuristics
+FEATURES = (
+    'mancala_diff',      # Mancala difference
+    'pit_diff',          # Stones in each side's pits, last pit left out (as in ABModifiedHeuristicAI)
+    'last_pit_diff',     # Stones in each side's last pit
+    'empty_pit_diff',    # Empty pits on each side (capture chances)
+    'to_move',           # +1 if player 1 is to move, -1 if player 2
+)
+# Weights that give ABModifiedHeuristicAI's heuristic: mancala_diff + 0.25*pit_diff
+ABMODIFIED_WEIGHTS = {'mancala_diff': 1.0, 'pit_diff': 0.25}
+
+def load_weights(path):
+    """
+    Weights saved by HeuristicTuning (a JSON file with a 'weights' {feature: weight} entry)
+    """
+    with open(path) as f:
+        weights = json.load(f)['weights']
+    unknown = set(weights) - set(FEATURES)
+    if unknown:
+        raise ValueError(f"unknown features in {path}: {sorted(unknown)}")
+    return weights
+
+
+def features(state):
+    """
+    FEATURES of a Mancala or GameState position, from player 1's point of view. The one scalar definition of the
+    features: WeightedHeuristic sums them, HeuristicTuning.feature_matrix computes the same values for many boards
+    """
+    board = state.board
+    P = state.pits_per_player
+    p1_total, p2_total = state.side_totals()
+    p1_last = board[P - 1]
+    p2_last = board[2 * P]
+    return (
+        board[P] - board[2 * P + 1],
+        (p1_total - p1_last) - (p2_total - p2_last),
+        p1_last - p2_last,
+        board[0:P].count(0) - board[P + 1:2 * P + 1].count(0),
+        1 if state.current_player == 1 else -1,
+    )
+
+
+class WeightedHeuristic:
+    def __init__(self, weights):
+        """
+        Weighted sum of FEATURES as a NegamaxAI heuristic: heuristic(state, player) -> value for player.
+        weights: {feature: weight}, missing features weigh 0
+        """
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"unknown features: {sorted(unknown)}")
+        self.weights = dict(weights)
+        self.weight_vector = tuple(float(weights.get(name, 0.0)) for name in FEATURES)
+
+    def __call__(self, state, player):
+        value = sum(weight * feature for weight, feature in zip(self.weight_vector, features(state)) if weight)
+        return value if player == 1 else -value
+
+
+class WeightedHeuristicAI(NegamaxAI):
+    def __init__(self, game: Mancala, playing=1, depth=5, tt=None, time_limit_ms=None, use_state=False, endgame=None, book=None, parallel=None, stats=None, persistent=False, weights=None, **options):
+        """
+        Alpha-beta player (NegamaxAI, same options) whose heuristic is a WeightedHeuristic.
+        weights: {feature: weight}, missing features weigh 0, or a path to weights saved by HeuristicTuning.
+                 ABMODIFIED_WEIGHTS by default, which plays exactly like ABModifiedHeuristicAI
+        """
+        if weights is None:
+            weights = ABMODIFIED_WEIGHTS
+        elif isinstance(weights, str):
+            weights = load_weights(weights)
+        heuristic = WeightedHeuristic(weights)
+        super().__init__(game, playing, depth, tt, time_limit_ms, use_state, endgame, book, parallel, stats, persistent,
+                         heuristic=heuristic, **options)
+        self.weights = heuristic.weights
+        # Rebuilds this AI in the ParallelSearch / Ponderer worker processes
+        self.heuristic_args = {'weights': self.weights}
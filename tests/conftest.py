@@ -0,0 +1,35 @@
+import os
+import random
+import sys
+import pytest
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MancalaGame import Mancala
+
+def _random_games(count, seed=1, max_plies=None, stop=None, ongoing=True, pits_per_player=6, stones_per_pit=4):
+    """
+    count Mancala games reached by random play from a seeded generator. Each game stops at a random ply below
+    max_plies (None: no limit), once stop(game) is true, or at the end of the game; with ongoing, games that
+    ended are left out. The boards are not swept
+    """
+    rng = random.Random(seed)
+    games = []
+    while len(games) < count:
+        game = Mancala(pits_per_player, stones_per_pit)
+        plies = rng.randrange(max_plies) if max_plies is not None else None
+        while not game.is_terminal() and (plies is None or len(game.moves) < plies) and not (stop and stop(game)):
+            game.play(game.random_move_generator(rng))
+        if ongoing and game.is_terminal():
+            continue
+        games.append(game)
+    return games
+
+
+@pytest.fixture
+def random_games():
+    """
+    Seeded random-play position factory shared by the tests, see _random_games
+    """
+    return _random_games
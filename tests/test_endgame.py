@@ -0,0 +1,37 @@
+import sys
+import pytest
+from ABPruningAI import ABPruningAI
+from EndgameDatabase import EndgameDatabase
+from MancalaGame import Mancala
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    return EndgameDatabase.build(str(tmp_path_factory.mktemp("endgame") / "endgame.db"), 6, 6)
+
+
+def stones_in_pits(game):
+    p1_total, p2_total = game.side_totals()
+    return p1_total + p2_total
+
+
+def test_values_match_full_search(database, random_games):
+    for game in random_games(60, seed=3, stop=lambda game: stones_in_pits(game) <= database.max_stones):
+        player = game.current_player
+        value, _ = ABPruningAI(game, player, 40).negamax(game, 40, float('-inf'), float('inf'))
+        assert database.final_score_diff(game, player) == value, game.board
+
+
+def test_build_rejects_values_past_a_byte(tmp_path):
+    with pytest.raises(ValueError):
+        EndgameDatabase.build(str(tmp_path / "big.db"), 6, 128)
+
+
+def test_build_restores_recursion_limit(tmp_path):
+    limit = sys.getrecursionlimit()
+    EndgameDatabase.build(str(tmp_path / "small.db"), 6, 3)
+    assert sys.getrecursionlimit() == limit
+
+
+def test_search_rejects_database_for_other_board(database):
+    with pytest.raises(ValueError):
+        ABPruningAI(Mancala(pits_per_player=4), 1, 5, endgame=database)
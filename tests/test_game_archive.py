@@ -0,0 +1,119 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import textwrap
+from collections import Counter
+import pytest
+from MancalaGame import Mancala
+from GameState import GameState
+from GameArchive import GameArchiveWriter, GameArchive, PositionIndex
+from PlayGames import PlayGames
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def archived_games(random_games, count, seed=1):
+    """
+    (seed, pits played) of count finished random games, seeds 1..count
+    """
+    return [(n + 1, [pit for _, pit in game.moves])
+            for n, game in enumerate(random_games(count, seed=seed, ongoing=False))]
+
+
+def test_roundtrip_and_resume(tmp_path, random_games):
+    path = str(tmp_path / "games.arc")
+    games = archived_games(random_games, 300)
+    with GameArchiveWriter(path, config={'run': 1}, checkpoint_every=7) as writer:
+        for seed, moves in games[:150]:
+            writer.write(seed, moves)
+    with GameArchiveWriter(path, config={'run': 1}, resume=True) as writer:
+        assert writer.games == 150
+        for seed, moves in games[150:]:
+            writer.write(seed, moves)
+    archive = GameArchive(path)
+    assert len(archive) == 300 and archive.config == {'run': 1}
+    assert list(archive) == games
+    assert archive.game(123) == games[123]
+    replayed = Mancala()
+    for pit in games[5][1][:10]:
+        replayed.play(pit)
+    assert archive.replay(5, 10).board == replayed.board
+
+
+def test_unflushed_games_are_dropped(tmp_path, random_games):
+    path = str(tmp_path / "games.arc")
+    games = archived_games(random_games, 30)
+    with GameArchiveWriter(path) as writer:
+        for seed, moves in games[:20]:
+            writer.write(seed, moves)
+    writer = GameArchiveWriter(path, resume=True, checkpoint_every=1000)
+    for seed, moves in games[20:]:
+        writer.write(seed, moves)
+    writer.file.flush()   # Game bytes on disk, their offsets not: what a crash between checkpoints leaves
+    assert GameArchiveWriter(path, resume=True).games == 20
+    assert list(GameArchive(path)) == games[:20]
+
+
+def test_position_index_counts(tmp_path, random_games):
+    path = str(tmp_path / "games.arc")
+    games = archived_games(random_games, 200, seed=2)
+    with GameArchiveWriter(path) as writer:
+        for seed, moves in games:
+            writer.write(seed, moves)
+    index = PositionIndex.build(path, str(tmp_path / "games.idx"), bucket_bits=3)
+    counts = Counter()
+    for _, moves in games:
+        game = Mancala()
+        for pit in moves:
+            game.play(pit)
+            counts[tuple(game.board), game.current_player] += 1
+    assert index.entries == sum(counts.values())
+    archive = GameArchive(path)
+    for (board, player), count in counts.most_common(30) + list(counts.items())[:300]:
+        found = index.lookup(GameState(board, player))
+        assert len(found) == count
+        game_index, ply = found[0]
+        replayed = archive.replay(game_index, ply)
+        assert (tuple(replayed.board), replayed.current_player) == (board, player)
+    assert index.count(Mancala()) == 0   # The starting position isn't indexed
+
+
+def test_play_games_resume_after_crash(tmp_path):
+    output = str(tmp_path / "results.csv")
+    archive = str(tmp_path / "games.arc")
+    # Dies at game 25 without closing anything, checkpoints every 10 games
+    script = textwrap.dedent(f"""
+        import os, sys
+        sys.path.insert(0, {REPO!r})
+        from PlayGames import PlayGames
+        class Crashing(PlayGames):
+            def play_game(self, game_num, *args, **kwargs):
+                if game_num == 25:
+                    os._exit(1)
+                return super().play_game(game_num, *args, **kwargs)
+        Crashing("random", "random", 40, seed=7).play_games(output={output!r}, archive={archive!r}, checkpoint_every=10)
+    """)
+    assert subprocess.run([sys.executable, "-c", script], capture_output=True).returncode == 1
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        PlayGames("random", "random", 40, seed=7).play_games(output=output, archive=archive, resume=True,
+                                                             checkpoint_every=10)
+        reference = str(tmp_path / "reference.arc")
+        PlayGames("random", "random", 40, seed=7).play_games(archive=reference)
+    assert len(GameArchive(archive)) == 40
+    assert list(GameArchive(archive)) == list(GameArchive(reference))
+
+
+def test_existing_files_are_only_replaced_on_request(tmp_path):
+    output = str(tmp_path / "results.csv")
+    archive = str(tmp_path / "games.arc")
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        PlayGames("random", "random", 5, seed=7).play_games(output=output, archive=archive)
+        with pytest.raises(FileExistsError):
+            PlayGames("random", "random", 3, seed=8).play_games(output=output, archive=archive)
+        with pytest.raises(FileExistsError):
+            PlayGames("random", "random", 3, seed=8).play_games(archive=archive)
+        assert len(GameArchive(archive)) == 5
+        PlayGames("random", "random", 3, seed=8).play_games(output=output, archive=archive, overwrite=True)
+    assert len(GameArchive(archive)) == 3
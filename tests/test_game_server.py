@@ -0,0 +1,58 @@
+import asyncio
+import json
+from GameServer import GameServer
+
+async def _exchange(server, requests):
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    responses = []
+    try:
+        for request in requests:
+            writer.write((request if isinstance(request, bytes) else json.dumps(request).encode()) + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return responses
+
+
+def run_requests(requests, **options):
+    async def main():
+        server = GameServer(port=0, workers=1, **options)
+        await server.start()
+        try:
+            return await _exchange(server, requests), server.counters
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_new_session_validates_limits():
+    bad = [
+        {'op': "new", 'time_limit_ms': "x"},
+        {'op': "new", 'time_limit_ms': 10**9},
+        {'op': "new", 'deadline_ms': -1},
+        {'op': "new", 'ai': "mcts", 'playouts': 10**12},
+        {'op': "new", 'ai': "minimax", 'depth': 10},
+        {'op': "new", 'depth': True},
+    ]
+    responses, _ = run_requests(bad + [{'op': "new", 'ai': "random"}], deadline_ms=2000)
+    assert [response['ok'] for response in responses] == [False] * len(bad) + [True]
+
+
+def test_unhashable_op_keeps_connection():
+    responses, _ = run_requests([{'op': ["move"]}, {'op': "new", 'ai': "random"}])
+    assert not responses[0]['ok']
+    assert responses[1]['ok']
+
+
+def test_failed_search_falls_back_to_random_move():
+    # Weights that only fail inside the worker, when the heuristic is built
+    responses, counters = run_requests([{'op': "new", 'ai': "weighted", 'depth': 2},
+                                        {'op': "move", 'session': 1, 'pit': 1},
+                                        {'op': "move", 'session': 1, 'pit': 2}],
+                                       weights={'mancala_diff': "not a number"})
+    new, first, second = responses
+    assert new['ok'] and first['ok'] and first['fallback']
+    assert second['ok'] and second['state']['player'] == 1
+    assert counters['ai_errors'] == 2
@@ -0,0 +1,25 @@
+import pytest
+from ABModifiedHeuristicAI import ABModifiedHeuristicAI
+from NegamaxAI import mancala_and_pits
+from WeightedHeuristicAI import FEATURES, WeightedHeuristic, WeightedHeuristicAI, features
+
+def test_feature_matrix_matches_scalar_features(random_games):
+    np = pytest.importorskip("numpy")
+    from HeuristicTuning import feature_matrix
+    games = random_games(300, seed=4, max_plies=60, ongoing=False)
+    matrix = feature_matrix([game.board for game in games], [game.current_player for game in games])
+    assert matrix.shape == (len(games), len(FEATURES))
+    assert np.array_equal(matrix, np.array([features(game) for game in games], dtype=np.float64))
+
+
+def test_default_weights_are_abmodified_heuristic(random_games):
+    heuristic = WeightedHeuristic({'mancala_diff': 1.0, 'pit_diff': 0.25})
+    for game in random_games(200, seed=5, max_plies=60, ongoing=False):
+        for player in (1, 2):
+            assert heuristic(game, player) == mancala_and_pits(game, player)
+
+
+def test_default_weighted_ai_plays_like_abmodified(random_games):
+    for game in random_games(20, seed=6, max_plies=60):
+        player = game.current_player
+        assert WeightedHeuristicAI(game, player, 4).choose_move() == ABModifiedHeuristicAI(game, player, 4).choose_move()
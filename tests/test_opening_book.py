@@ -0,0 +1,25 @@
+import pytest
+from ABPruningAI import ABPruningAI
+from ABModifiedHeuristicAI import ABModifiedHeuristicAI
+from MancalaGame import Mancala
+from OpeningBook import OpeningBook
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+    return OpeningBook.build(str(tmp_path_factory.mktemp("book") / "book.bin"), "abpruning", plies=2, depth=3)
+
+
+def test_book_moves_are_the_search_moves(book):
+    game = Mancala()
+    assert ABPruningAI(game, 1, 3, book=book).choose_move() == ABPruningAI(game, 1, 3).choose_move()
+
+
+@pytest.mark.parametrize("make_ai", [
+    lambda book: ABModifiedHeuristicAI(Mancala(), 1, 3, book=book),
+    lambda book: ABPruningAI(Mancala(), 1, 4, book=book),
+    lambda book: ABPruningAI(Mancala(pits_per_player=4), 1, 3, book=book),
+    lambda book: ABPruningAI(Mancala(stones_per_pit=3), 1, 3, book=book),
+])
+def test_search_rejects_book_it_does_not_fit(book, make_ai):
+    with pytest.raises(ValueError):
+        make_ai(book)
@@ -0,0 +1,35 @@
+import pytest
+from ABPruningAI import ABPruningAI
+from MancalaGame import Mancala
+from ParallelSearch import ParallelSearch
+from TranspositionTable import TranspositionTable
+
+@pytest.mark.parametrize("options", [{'time_limit_ms': 100}, {'tt': TranspositionTable(1024)}])
+def test_rejects_settings_parallel_search_would_ignore(options):
+    with pytest.raises(ValueError):
+        ABPruningAI(Mancala(), 1, 5, parallel=ParallelSearch(2), **options)
+
+
+def test_finished_game_is_left_unswept():
+    game = Mancala()
+    game.board = [0, 0, 0, 0, 0, 0, 20, 1, 2, 0, 0, 0, 3, 22]
+    assert ABPruningAI(game, 1, 5, parallel=ParallelSearch(2)).choose_move() is None
+    assert game.board == [0, 0, 0, 0, 0, 0, 20, 1, 2, 0, 0, 0, 3, 22]
+
+
+@pytest.fixture(scope="module")
+def search():
+    search = ParallelSearch(2)
+    yield search
+    search.close()
+
+
+def test_same_move_and_value_as_serial_search(search, random_games):
+    for game in random_games(12, seed=4, max_plies=30):
+        serial = ABPruningAI(game, game.current_player, 5)
+        value, move = serial.negamax(game, 5, float('-inf'), float('inf'))
+        parallel_move = ABPruningAI(game, game.current_player, 5, parallel=search).choose_move()
+        assert parallel_move == move, game.board
+        undo = game.make_move(parallel_move)
+        assert -serial.negamax(game, 4, float('-inf'), float('inf'))[0] == value
+        game.unmake_move(undo)
@@ -0,0 +1,14 @@
+import contextlib
+import io
+from PlayGames import PlayGames
+
+def quiet_games(*args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return PlayGames(*args, **kwargs)
+
+
+def test_ponder_with_random_opening():
+    runner = quiet_games("abpruning", "random", 2, depth=3, seed=1, reuse_search=True, ponder=True, opening_plies=2)
+    with contextlib.redirect_stderr(io.StringIO()):
+        results = runner.play_games()
+    assert len(results['status']) == 2
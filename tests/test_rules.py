@@ -0,0 +1,58 @@
+import pytest
+from GameState import GameState, successor
+from MancalaGame import Mancala
+
+def reference_play(board, player, pit):
+    """
+    Board after player plays pit, sowing stone by stone (the original Mancala.play). A last stone that hops the
+    opponent's mancala onto the own first pit never captures
+    """
+    board = list(board)
+    P = len(board) // 2 - 1
+    own_pits = range(0, P) if player == 1 else range(P + 1, 2 * P + 1)
+    own_mancala, opp_mancala = (P, 2 * P + 1) if player == 1 else (2 * P + 1, P)
+    index = own_pits[pit - 1]
+    stones = board[index]
+    board[index] = 0
+    hopped = False
+    while stones:
+        index = (index + 1) % len(board)
+        hopped = index == opp_mancala
+        if hopped:
+            index = (index + 1) % len(board)
+        board[index] += 1
+        stones -= 1
+    if index in own_pits and board[index] == 1 and not hopped:
+        opposite = 2 * P - index
+        board[own_mancala] += 1 + board[opposite]
+        board[opposite] = 0
+        board[index] = 0
+    return board
+
+
+@pytest.mark.parametrize("pits_per_player, stones_per_pit", [(6, 4), (4, 3), (3, 12)])
+def test_play_matches_stone_by_stone_sowing(random_games, pits_per_player, stones_per_pit):
+    for game in random_games(200, seed=5, max_plies=200, pits_per_player=pits_per_player, stones_per_pit=stones_per_pit):
+        board, player = list(game.board), game.current_player
+        for pit in game.get_valid_moves():
+            expected = reference_play(board, player, pit)
+            assert successor(GameState(board, player), pit).board == tuple(expected)
+            undo = game.make_move(pit)
+            assert game.board == expected, (board, player, pit)
+            assert list(game.side_totals()) == [sum(expected[:pits_per_player]), sum(expected[pits_per_player + 1:-1])]
+            game.unmake_move(undo)
+
+
+@pytest.mark.parametrize("pits_per_player, stones_per_pit", [(6, 4), (3, 12)])
+def test_batch_games_replay_on_the_scalar_engine(pits_per_player, stones_per_pit):
+    pytest.importorskip("numpy")
+    from BatchMancala import play_random_games
+    batch, moves = play_random_games(300, seed=3, pits_per_player=pits_per_player, stones_per_pit=stones_per_pit,
+                                     record_moves=True)
+    for k in range(batch.n_games):
+        game = Mancala(pits_per_player, stones_per_pit)
+        for pit in moves[k, :batch.num_moves[k]]:
+            assert not game.winning_eval()
+            game.play(int(pit))
+        game.winning_eval()
+        assert game.board == batch.board[k].tolist(), k
@@ -0,0 +1,51 @@
+import pytest
+from MancalaGame import Mancala
+from MinimaxAI import MinimaxAI
+from ABPruningAI import ABPruningAI
+from ABModifiedHeuristicAI import ABModifiedHeuristicAI
+
+def game_at(board, player):
+    game = Mancala()
+    game.board = list(board)
+    game.current_player = player
+    game.count_sides()
+    return game
+
+
+@pytest.mark.parametrize("ai_class, depths", [
+    (MinimaxAI, (1, 2, 3)),
+    (ABPruningAI, (1, 2, 3, 4, 5)),
+    (ABModifiedHeuristicAI, (1, 2, 3, 4, 5)),
+])
+def test_state_search_matches_live_search(random_games, ai_class, depths):
+    for position in random_games(40, max_plies=50):
+        board, player = position.board, position.current_player
+        for depth in depths:
+            for playing in (1, 2):
+                live = ai_class(game_at(board, player), playing, depth).choose_move()
+                state = ai_class(game_at(board, player), playing, depth, use_state=True).choose_move()
+                assert live == state, (board, player, depth, playing)
+
+
+def test_state_search_terminal_at_horizon():
+    # A terminal position at depth 0 is scored like the live search, by the heuristic on the unswept board
+    board, player = [1, 1, 0, 6, 0, 3, 2, 0, 1, 0, 5, 1, 0, 4], 2
+    for ai_class in (ABPruningAI, ABModifiedHeuristicAI):
+        live = ai_class(game_at(board, player), player, 3).choose_move()
+        assert ai_class(game_at(board, player), player, 3, use_state=True).choose_move() == live
+
+
+def test_live_search_leaves_game_unchanged(random_games):
+    for game in random_games(10, seed=2, max_plies=50):
+        before = game.snapshot()
+        ABPruningAI(game, game.current_player, 5).choose_move()
+        assert game.snapshot() == before
+
+
+def test_transposition_table_must_fit_the_board():
+    from TranspositionTable import TranspositionTable
+    with pytest.raises(ValueError):
+        ABPruningAI(Mancala(4, 4), 1, 4, TranspositionTable(1 << 10))
+    game = Mancala(4, 4)
+    tt = TranspositionTable(1 << 10, board_size=len(game.board))
+    assert ABPruningAI(game, 1, 4, tt).choose_move() == ABPruningAI(Mancala(4, 4), 1, 4).choose_move()